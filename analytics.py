@@ -0,0 +1,279 @@
+import argparse
+import json
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for the analytics report
+    np = None
+
+from free_slots import RESOLUTION
+from timetable_combiner import CACHE_FILE, DAYS, ParseCache, extract_tables, min_to_time
+
+ANALYTICS_FILE = "analytics.json"
+HEATMAP_SHADES = " .:-=+*#%@"
+
+
+class SessionColumns:
+    """Weekday sessions as integer-coded columns, filled while they are merged (see add_sessions).
+
+    Course, room, class and teacher names are coded in order of first appearance, and each distinct
+    teacher list once, so lecture_spans is left with NumPy work only.
+    """
+
+    def __init__(self):
+        self.codes = {"course": {}, "room": {}, "class": {}, "teacher": {}}
+        self.teacher_lists = {}
+        self.list_teachers = array("q")  # teacher codes of each distinct list, concatenated
+        self.list_sizes = array("q")
+        self.columns = {field: array("q") for field in
+                        ("day", "start", "end", "course", "room", "class", "teacher_list")}
+
+    @classmethod
+    def from_blocks(cls, course_blocks):
+        """Columns for block maps built without them (course_blocks holds every session once)."""
+        columns = cls()
+        for day_blocks in course_blocks.values():
+            for blocks in day_blocks.values():
+                columns.extend(blocks)
+        return columns
+
+    def extend(self, sessions):
+        courses, rooms, classes, teachers = self.codes.values()
+        teacher_lists = self.teacher_lists
+        day, start, end, course, room, class_name, teacher_list = (column.append for column in self.columns.values())
+        for session in sessions:
+            if session.day < 0:
+                continue
+            day(session.day)
+            start(session.start)
+            end(session.end)
+            course(courses.setdefault(session.course, len(courses)))
+            room(rooms.setdefault(session.room, len(rooms)))
+            class_name(classes.setdefault(session.class_name, len(classes)))
+            code = teacher_lists.get(session.teachers)
+            if code is None:
+                code = teacher_lists[session.teachers] = len(teacher_lists)
+                # A teacher named twice in one cell still teaches the lecture once
+                names = dict.fromkeys(session.teachers)
+                self.list_teachers.extend(teachers.setdefault(teacher, len(teachers)) for teacher in names)
+                self.list_sizes.append(len(names))
+            teacher_list(code)
+
+
+def _ranked(codes):
+    """Sorted names, and each first-appearance code's index among them."""
+    names = sorted(codes)
+    rank = np.empty(len(names), dtype=np.intp)
+    rank[[codes[name] for name in names]] = np.arange(len(names))
+    return names, rank
+
+
+def _row_keys(*columns):
+    """One int64 key per row of non-negative integer columns, equal exactly when the rows are equal.
+
+    The columns are packed as mixed-radix digits; should the key outgrow int64, the digits so far
+    are first renumbered densely with np.unique.
+    """
+    keys, bound = np.zeros(len(columns[0]), dtype=np.int64), 1
+    for column in columns:
+        radix = int(column.max()) + 1
+        if bound * radix >= 2 ** 63:
+            keys = np.unique(keys, return_inverse=True)[1].reshape(-1)
+            bound = int(keys.max()) + 1
+        keys = keys * radix + column
+        bound *= radix
+    return keys
+
+
+def lecture_spans(columns):
+    """Turn SessionColumns into (names, entity, day, start, end) arrays for rooms, teachers and classes.
+
+    Rooms ("Unknown Room" left out) and teachers count each distinct lecture (a session without its
+    class) once, as in find_conflicts, however many classes share it; distinct lectures are found
+    with np.unique. Classes count every session of theirs. Entity indices follow the sorted names.
+    """
+    days, starts, ends, course, room, klass, teacher_list = (
+        np.array(column, dtype=np.intp) for column in columns.columns.values()
+    )
+    if not len(days):
+        empty = np.zeros(0, dtype=np.intp)
+        return [([], empty, empty, empty, empty)] * 3
+
+    room_names, rank = _ranked(columns.codes["room"])
+    room = rank[room]
+    class_names, rank = _ranked(columns.codes["class"])
+    klass = rank[klass]
+    teacher_names, rank = _ranked(columns.codes["teacher"])
+    list_teachers = rank[np.array(columns.list_teachers, dtype=np.intp)]
+    list_sizes = np.array(columns.list_sizes, dtype=np.intp)
+
+    # One session per distinct lecture
+    _, lectures = np.unique(_row_keys(days, starts, ends, course, room, teacher_list), return_index=True)
+
+    # Rooms: one row per lecture
+    rows, room_entity = lectures, room[lectures]
+    if "Unknown Room" in room_names:
+        unknown = room_names.index("Unknown Room")
+        del room_names[unknown]
+        rows = rows[room_entity != unknown]
+        room_entity = room[rows] - (room[rows] > unknown)
+    room_view = (room_names, room_entity, days[rows], starts[rows], ends[rows])
+
+    # Teachers: one row per teacher of each lecture, expanded from the lecture's teacher list
+    sizes = list_sizes[teacher_list[lectures]]
+    rows = np.repeat(lectures, sizes)
+    offsets = (np.cumsum(list_sizes) - list_sizes)[teacher_list[lectures]] - (np.cumsum(sizes) - sizes)
+    teacher_entity = list_teachers[np.repeat(offsets, sizes) + np.arange(len(rows))]
+    teacher_view = (teacher_names, teacher_entity, days[rows], starts[rows], ends[rows])
+
+    return [room_view, teacher_view, (class_names, klass, days, starts, ends)]
+
+
+def occupancy_tensor(n_entities, entity, day, start, end, first_minute, n_buckets, n_days=len(DAYS)):
+    """Count lectures per (entity, day, RESOLUTION-minute bucket) from lecture_spans arrays.
+
+    The tensor is a difference array (+1 at a lecture's first bucket, -1 after its last) summed along
+    the bucket axis, with no Python loop. The +1s and -1s are counted per cell with np.unique and
+    added straight into an int16 array, rather than with bincounts the size of the whole tensor.
+    """
+    row = (entity * n_days + day) * (n_buckets + 1)
+    diff = np.zeros(n_entities * n_days * (n_buckets + 1), dtype=np.int16)
+    cells, counts = np.unique(row + (start - first_minute) // RESOLUTION, return_counts=True)
+    diff[cells] += counts.astype(np.int16)
+    cells, counts = np.unique(row + -(-(end - first_minute) // RESOLUTION), return_counts=True)
+    diff[cells] -= counts.astype(np.int16)
+    return np.cumsum(diff.reshape(n_entities, n_days, n_buckets + 1), axis=2, dtype=np.int16)[:, :, :-1]
+
+
+def _peak(heatmap, first_minute):
+    day, bucket = np.unravel_index(int(heatmap.argmax()), heatmap.shape) if heatmap.size else (0, 0)
+    return {
+        "value": int(heatmap.max()) if heatmap.size else 0,
+        "day": DAYS[day],
+        "time": min_to_time(first_minute + int(bucket) * RESOLUTION),
+    }
+
+
+def utilisation_report(columns):
+    """Room utilisation, teacher load per day, peak concurrency and campus-wide heatmaps from SessionColumns.
+
+    Utilisation is measured against the teaching window (first start to last end of the term) on
+    the days that have any teaching. Heatmaps are (day, bucket) counts of rooms in use, teachers
+    teaching and classes in session.
+    """
+    started = time.perf_counter()
+    views = lecture_spans(columns)
+    collected = time.perf_counter()
+
+    # Teaching window: first start to last end over every weekday session, aligned to RESOLUTION
+    starts = np.concatenate([view[3] for view in views])
+    ends = np.concatenate([view[4] for view in views])
+    first_minute = int(starts.min()) // RESOLUTION * RESOLUTION if starts.size else 0
+    n_buckets = -(-(int(ends.max()) - first_minute) // RESOLUTION) if ends.size else 0
+    (room_names, room_counts), (teacher_names, teacher_counts), (class_names, class_counts) = [
+        (names, occupancy_tensor(len(names), *arrays, first_minute, n_buckets)) for names, *arrays in views
+    ]
+    built = time.perf_counter()
+
+    room_busy = room_counts > 0
+    teacher_busy = teacher_counts > 0
+    class_busy = class_counts > 0
+
+    heatmaps = {
+        "rooms": room_busy.sum(axis=0),
+        "teachers": teacher_busy.sum(axis=0),
+        "classes": class_busy.sum(axis=0),
+    }
+    teaching_days = np.flatnonzero(heatmaps["classes"].any(axis=1))
+    capacity = len(teaching_days) * n_buckets * RESOLUTION / 60  # hours per room
+
+    room_hours = room_busy.sum(axis=(1, 2)) * RESOLUTION / 60
+    room_utilisation = room_hours * 100 / capacity if capacity else np.zeros(len(room_names))
+    teacher_load = teacher_busy.sum(axis=2) * RESOLUTION / 60
+    double_booked = (room_counts > 1).sum(axis=(1, 2)) * RESOLUTION / 60
+    reduced = time.perf_counter()
+
+    report = {
+        "resolution": RESOLUTION,
+        "window": [min_to_time(first_minute), min_to_time(first_minute + n_buckets * RESOLUTION)],
+        "teachingDays": [DAYS[d] for d in teaching_days],
+        "timing_ms": {
+            "collect": round((collected - started) * 1000, 2),
+            "tensors": round((built - collected) * 1000, 2),
+            "reductions": round((reduced - built) * 1000, 2),
+        },
+        "peaks": {label: _peak(heatmap, first_minute) for label, heatmap in heatmaps.items()},
+        "meanRoomUtilisation": round(float(room_utilisation.mean()), 1) if len(room_names) else 0.0,
+        "rooms": {
+            room: {"hours": float(hours), "utilisation": round(float(util), 1), "doubleBookedHours": float(double)}
+            for room, hours, util, double in zip(room_names, room_hours, room_utilisation, double_booked)
+        },
+        "teacherLoad": {
+            teacher: {DAYS[d]: float(load[d]) for d in teaching_days}
+            for teacher, load in zip(teacher_names, teacher_load)
+        },
+        "classHours": dict(zip(class_names, (class_busy.sum(axis=(1, 2)) * RESOLUTION / 60).tolist())),
+        "heatmaps": {label: heatmap.tolist() for label, heatmap in heatmaps.items()},
+    }
+    return report
+
+
+def print_report(report, top=5):
+    """Print the highlights of utilisation_report and a rooms-in-use heatmap at half-hour resolution."""
+    timing = report["timing_ms"]
+    print(f"Teaching window {report['window'][0]} - {report['window'][1]} on {len(report['teachingDays'])} days "
+          f"(collect {timing['collect']:.1f} ms, tensors {timing['tensors']:.1f} ms, "
+          f"reductions {timing['reductions']:.1f} ms).")
+    for label, peak in report["peaks"].items():
+        print(f"Peak concurrent {label}: {peak['value']} on {peak['day']} at {peak['time']}")
+    print(f"Mean room utilisation: {report['meanRoomUtilisation']:.1f}%")
+
+    rooms = sorted(report["rooms"].items(), key=lambda item: -item[1]["utilisation"])
+    print("Busiest rooms: " + ", ".join(f"{room} {r['utilisation']:.0f}%" for room, r in rooms[:top]))
+    print("Least used rooms: " + ", ".join(f"{room} {r['utilisation']:.0f}%" for room, r in rooms[-top:]))
+
+    heaviest = sorted(
+        ((hours, teacher, day) for teacher, load in report["teacherLoad"].items() for day, hours in load.items()),
+        reverse=True,
+    )
+    print("Heaviest teacher days: " + ", ".join(f"{t} {h:.1f}h ({d[:3]})" for h, t, d in heaviest[:top]))
+
+    heatmap = np.array(report["heatmaps"]["rooms"])
+    if heatmap.size and heatmap.max():
+        per_half_hour = 30 // RESOLUTION
+        width = -(-heatmap.shape[1] // per_half_hour) * per_half_hour
+        padded = np.pad(heatmap, ((0, 0), (0, width - heatmap.shape[1])))
+        coarse = padded.reshape(len(heatmap), -1, per_half_hour).max(axis=2)
+        shades = np.round(coarse * (len(HEATMAP_SHADES) - 1) / heatmap.max()).astype(int)
+        print(f"Rooms in use, {report['window'][0]} onwards, one column per 30 minutes:")
+        for d, day in enumerate(DAYS):
+            print(f"  {day[:3]} |" + "".join(HEATMAP_SHADES[s] for s in shades[d]) + "|")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room utilisation, teacher load and campus heatmaps from the timetables.")
+    parser.add_argument("-o", "--output", default=ANALYTICS_FILE, help=f"JSON report path (default: {ANALYTICS_FILE})")
+    parser.add_argument("--top", type=int, default=5, help="rooms/teachers listed in each summary line")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("NumPy is required: pip install numpy")
+
+    cache = ParseCache(CACHE_FILE)
+    try:
+        columns = SessionColumns()
+        extract_tables(cache=cache, columns=columns)
+    finally:
+        cache.close()
+
+    report = utilisation_report(columns)
+    print_report(report, args.top)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, ensure_ascii=False)
+    print(f"Full report written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import analytics
+from synthetic_corpus import generate_corpus
+from timetable_combiner import (
+    DAYS, DEFAULT_BACKEND, INPUT_DIR, OUTPUT_FILE, PARSER_BACKENDS, FragmentCache, Session, add_sessions,
+    build_generic_tables, build_html, extract_tables, new_block_map, peak_rss_mb, write_html,
+)
+
+# Roughly one term of KFUEIT data: classes listed in courses.txt and the entities they share
+BASE_CLASSES = 345
+SLOT_STARTS = [540, 630, 720, 810, 900]  # 09:00 .. 15:00, 90-minute slots
+BASELINE_FILE = "benchmark_baseline.json"
+REGRESSION_TOLERANCE = 0.10  # flag phases more than 10% slower / larger than the baseline
+
+
+def synthetic_sessions(n_classes, seed=0):
+    """Generate plausible sessions for n_classes, with teachers, courses and rooms scaling alongside."""
+    rng = random.Random(seed)
+    teachers = [f"{rng.choice(['Dr.', 'Mr.', 'Ms.', 'Engr.'])} Teacher {i}" for i in range(max(1, n_classes // 2))]
+    courses = [f"COSC-{1000 + i}-Course {i}" for i in range(max(1, n_classes))]
+    rooms = [f"COSC.{i % 4}.{i:03d}R" for i in range(max(1, n_classes // 3))]
+
+    sessions = []
+    for c in range(n_classes):
+        class_name = f"BS-SYN-{c}"
+        for d in range(len(DAYS) - 1):
+            for start in SLOT_STARTS:
+                if rng.random() < 0.45:
+                    continue
+                length = 180 if start < 900 and rng.random() < 0.1 else 90
+                sessions.append(Session(
+                    d, start, start + length, rng.choice(courses),
+                    tuple(rng.sample(teachers, 2 if rng.random() < 0.1 else 1)), rng.choice(rooms), class_name,
+                ))
+    return sessions
+
+
+def bench_render(scale, seed=0):
+    """Time build_generic_tables for the teacher, course and room views at scale × today's corpus.
+
+    The views share one FragmentCache, as in write_output; its overall hit rate is returned too.
+    """
+    teacher_blocks, course_blocks, room_blocks = new_block_map(), new_block_map(), new_block_map()
+    sessions = synthetic_sessions(BASE_CLASSES * scale, seed)
+    add_sessions(sessions, teacher_blocks, course_blocks, room_blocks)
+
+    fragments = FragmentCache()
+    start = time.perf_counter()
+    build_generic_tables(teacher_blocks, "Teacher", fragments=fragments)
+    build_generic_tables(course_blocks, "Course", fragments=fragments)
+    build_generic_tables(room_blocks, "Room", fragments=fragments)
+    elapsed = time.perf_counter() - start
+
+    entities = len(teacher_blocks) + len(course_blocks) + len(room_blocks)
+    hits = sum(stats[0] for stats in fragments.stats.values())
+    lookups = hits + sum(stats[1] for stats in fragments.stats.values())
+    return len(sessions), entities, elapsed, hits / lookups if lookups else 0
+
+
+def bench_write(scale, seed=0):
+    """Compare tracemalloc peaks of build_html + write against the streaming write_html at scale × today's corpus."""
+    teacher_blocks, course_blocks, room_blocks = new_block_map(), new_block_map(), new_block_map()
+    class_blocks = new_block_map()
+    sessions = synthetic_sessions(BASE_CLASSES * scale, seed)
+    add_sessions(sessions, teacher_blocks, course_blocks, room_blocks)
+    for session in sessions:
+        class_blocks[session.class_name][session.day].append(session)
+
+    tables = (
+        build_generic_tables(class_blocks, "Class"),
+        build_generic_tables(teacher_blocks, "Teacher"),
+        build_generic_tables(course_blocks, "Course"),
+        build_generic_tables(room_blocks, "Room"),
+    )
+
+    def in_memory(f):
+        f.write(build_html(*tables))
+
+    def streaming(f):
+        write_html(f, *tables)
+
+    peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.html")
+        for writer in (in_memory, streaming):
+            tracemalloc.start()
+            with open(path, "w", encoding="utf-8") as f:
+                writer(f)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        size = os.path.getsize(path)
+    return size, peaks[0], peaks[1]
+
+
+def bench_analytics(scale, seed=0):
+    """Time analytics at scale × today's corpus: filling SessionColumns during the merge, then utilisation_report.
+
+    Returns the session count, the extra merge time add_sessions spends on the columns, and the
+    report's collect, tensor and reduction times, all in ms; end to end is their sum.
+    """
+    sessions = synthetic_sessions(BASE_CLASSES * scale, seed)
+    merge_ms = []
+    for columns in (None, analytics.SessionColumns()):
+        started = time.perf_counter()
+        add_sessions(sessions, new_block_map(), new_block_map(), new_block_map(), columns)
+        merge_ms.append((time.perf_counter() - started) * 1000)
+    timing = analytics.utilisation_report(columns)["timing_ms"]
+    return len(sessions), merge_ms[1] - merge_ms[0], timing["collect"], timing["tensors"], timing["reductions"]
+
+
+def bench_corpus(scale, workers=1, backend=DEFAULT_BACKEND, seed=0):
+    """Generate scale × today's class pages in a temp course_htmls/ and time the full build on them.
+
+    Phases are generate, extract (extract_tables), render (build_generic_tables for the three views)
+    and write (write_html). Each phase records its wall time and the process's peak RSS once it is
+    done; the peak never goes down, so run every scale in a fresh process (see run_corpus_benchmarks).
+    """
+    phases = {}
+
+    def finish(phase, started):
+        phases[phase] = {"seconds": round(time.perf_counter() - started, 3), "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            started = time.perf_counter()
+            paths = generate_corpus(INPUT_DIR, BASE_CLASSES * scale, seed=seed)
+            input_size = sum(os.path.getsize(path) for path in paths)
+            finish("generate", started)
+
+            started = time.perf_counter()
+            class_tables, teacher_blocks, course_blocks, room_blocks = extract_tables(workers, backend=backend)
+            finish("extract", started)
+
+            started = time.perf_counter()
+            fragments = FragmentCache()
+            teacher_tables = build_generic_tables(teacher_blocks, "Teacher", fragments=fragments)
+            course_tables = build_generic_tables(course_blocks, "Course", fragments=fragments)
+            room_tables = build_generic_tables(room_blocks, "Room", fragments=fragments)
+            finish("render", started)
+
+            started = time.perf_counter()
+            with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+                write_html(f, class_tables, teacher_tables, course_tables, room_tables)
+            finish("write", started)
+            output_size = os.path.getsize(OUTPUT_FILE)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "scale": scale,
+        "classes": len(class_tables),
+        "sessions": sum(len(blocks) for day_blocks in course_blocks.values() for blocks in day_blocks.values()),
+        "input_mb": round(input_size / 1e6, 1),
+        "output_mb": round(output_size / 1e6, 1),
+        "phases": phases,
+    }
+
+
+def run_corpus_benchmarks(scales, workers=1, backend=DEFAULT_BACKEND):
+    """Run bench_corpus for every scale, each in its own process so peak RSS is per scale."""
+    results = []
+    for scale in scales:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(bench_corpus, scale, workers, backend).result())
+    return results
+
+
+def compare_to_baseline(results, baseline):
+    """Print each phase's time and peak RSS against the baseline run; return the number of regressions."""
+    previous = {run["scale"]: run for run in baseline["results"]}
+    regressions = 0
+
+    def delta(now, before):
+        nonlocal regressions
+        if not before:
+            return f"{now:>9}"
+        change = (now - before) / before
+        flag = " !" if change > REGRESSION_TOLERANCE else ""
+        regressions += bool(flag)
+        return f"{now:>9} ({change:+.0%}){flag}"
+
+    print(f"Compared with baseline from {baseline['created']} ({baseline['backend']}, -j {baseline['workers']}):")
+    for run in results:
+        before = previous.get(run["scale"])
+        if before is None:
+            print(f"{run['scale']:>4}×  no baseline")
+            continue
+        for phase, now in run["phases"].items():
+            old = before["phases"].get(phase, {})
+            print(f"{run['scale']:>4}× {phase:<9} {delta(now['seconds'], old.get('seconds'))} s"
+                  f"   peak {delta(now['peak_rss_mb'], old.get('peak_rss_mb'))} MB")
+        print(f"{run['scale']:>4}× {'output':<9} {delta(run['output_mb'], before['output_mb'])} MB")
+    if regressions:
+        print(f"{regressions} measurements regressed by more than {REGRESSION_TOLERANCE:.0%} (marked !).")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the timetable render and write phases on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+",
+                        help="corpus sizes as multiples of today's class count (default: 1 2 5 10; corpus: 1 10 100)")
+    parser.add_argument("--phase", choices=["render", "write", "analytics", "corpus", "all"], default="all",
+                        help="render: build_generic_tables time; write: output peak memory; "
+                             "analytics: NumPy utilisation report time; corpus: full build on generated class pages")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="corpus: extract_tables worker processes")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+                        help=f"corpus: HTML parser backend (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help=f"corpus: results to compare against, if the file exists (default: {BASELINE_FILE})")
+    parser.add_argument("--save-baseline", action="store_true", help="corpus: store this run as the new baseline")
+    args = parser.parse_args()
+
+    if args.phase == "corpus":
+        results = run_corpus_benchmarks(args.scales or [1, 10, 100], max(1, args.jobs), args.parser)
+        print(f"{'scale':>5} {'classes':>8} {'sessions':>9} {'extract s':>10} {'render s':>9} {'write s':>8}"
+              f" {'peak RSS MB':>12} {'input MB':>9} {'output MB':>10}")
+        for run in results:
+            phases = run["phases"]
+            print(f"{run['scale']:>4}× {run['classes']:>8} {run['sessions']:>9} {phases['extract']['seconds']:>10.2f}"
+                  f" {phases['render']['seconds']:>9.2f} {phases['write']['seconds']:>8.2f}"
+                  f" {phases['write']['peak_rss_mb']:>12.1f} {run['input_mb']:>9.1f} {run['output_mb']:>10.1f}")
+
+        regressions = 0
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                regressions = compare_to_baseline(results, json.load(f))
+        if args.save_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump({
+                    "created": time.strftime("%Y-%m-%d %H:%M"), "backend": args.parser, "workers": max(1, args.jobs),
+                    "results": results,
+                }, f, indent=1)
+            print(f"Saved baseline to {args.baseline}.")
+        raise SystemExit(1 if regressions else 0)
+
+    args.scales = args.scales or [1, 2, 5, 10]
+
+    if args.phase in ("render", "all"):
+        print(f"{'scale':>5} {'sessions':>9} {'entities':>9} {'render s':>9} {'µs/session':>11} {'fragment hits':>14}")
+        for scale in args.scales:
+            n_sessions, entities, elapsed, hit_rate = bench_render(scale)
+            print(f"{scale:>4}× {n_sessions:>9} {entities:>9} {elapsed:>9.3f} {elapsed / n_sessions * 1e6:>11.1f}"
+                  f" {hit_rate:>14.0%}")
+
+    if args.phase in ("write", "all"):
+        print(f"{'scale':>5} {'output MB':>10} {'in-memory peak MB':>18} {'streaming peak MB':>18}")
+        for scale in args.scales:
+            size, in_memory_peak, streaming_peak = bench_write(scale)
+            print(f"{scale:>4}× {size / 1e6:>10.1f} {in_memory_peak / 1e6:>18.1f} {streaming_peak / 1e6:>18.1f}")
+
+    if args.phase in ("analytics", "all") and analytics.np is not None:
+        print(f"{'scale':>5} {'sessions':>9} {'merge +ms':>10} {'collect ms':>11} {'tensors ms':>11}"
+              f" {'reductions ms':>14} {'report ms':>10} {'end-to-end ms':>14}")
+        for scale in args.scales:
+            n_sessions, columns_ms, collect_ms, tensors_ms, reductions_ms = bench_analytics(scale)
+            report_ms = collect_ms + tensors_ms + reductions_ms
+            print(f"{scale:>4}× {n_sessions:>9} {columns_ms:>10.1f} {collect_ms:>11.1f} {tensors_ms:>11.1f}"
+                  f" {reductions_ms:>14.1f} {report_ms:>10.1f} {columns_ms + report_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
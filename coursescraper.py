@@ -1,11 +1,25 @@
 import os
+import argparse
 import asyncio
+import hashlib
+import json
+import random
+import tempfile
+import time
 import aiohttp
 
 # Output folder for HTML files
 OUTPUT_DIR = "course_htmls"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# ETag / Last-Modified / content hash of every downloaded course, for conditional refreshes
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, "manifest.json")
+
+# Retry policy: attempts per course and full-jitter exponential backoff bounds (seconds)
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
 # Endpoint base
 BASE_URL = "https://my.kfueit.edu.pk/users/testtable"
 
@@ -31,13 +45,118 @@ COOKIES = {
 }
 
 
-async def fetch_course(session, course):
-    filename = os.path.join(OUTPUT_DIR, f"{course}.html")
+def write_atomic(path, data):
+    """Write bytes via a temp file + rename, so a killed run never leaves a truncated file behind."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-    # Skip if file already exists
-    if os.path.exists(filename):
-        print(f"[SKIP] {course}.html already exists")
-        return
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+
+class RetryableError(Exception):
+    """A failure worth retrying: HTTP 429/5xx, optionally with the server's Retry-After hint."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency window driven by response latency and 5xx/429 rates.
+
+    The window grows by one after a window's worth of healthy responses and halves on an overload
+    signal (a 5xx/429, or latency above latency_factor × the running baseline), at most once per
+    baseline latency so a single burst of errors doesn't collapse it to the minimum.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, latency_factor=3.0):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_factor = latency_factor
+        self.active = 0
+        self.baseline = None
+        self._healthy = 0
+        self._last_decrease = 0.0
+        self._waiters = []
+
+    async def acquire(self):
+        while self.active >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.active += 1
+
+    def release(self, latency, overloaded):
+        self.active -= 1
+        now = time.monotonic()
+        slow = self.baseline is not None and latency > self.latency_factor * self.baseline
+
+        if overloaded or slow:
+            if now - self._last_decrease > (self.baseline or 0):
+                self.limit = max(self.minimum, self.limit // 2)
+                self._last_decrease = now
+            self._healthy = 0
+        else:
+            self._healthy += 1
+            if self._healthy >= self.limit:
+                self.limit = min(self.maximum, self.limit + 1)
+                self._healthy = 0
+
+        if not overloaded:
+            self.baseline = latency if self.baseline is None else 0.9 * self.baseline + 0.1 * latency
+
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class FetchReport:
+    """Counters for the end-of-run summary."""
+
+    def __init__(self):
+        self.latencies = []
+        self.attempts = 0
+        self.retries = 0
+        self.completed = 0
+        self.failed = []
+
+    def print_summary(self, elapsed, limiter):
+        print(f"Completed {self.completed} courses in {elapsed:.1f}s "
+              f"({self.completed / elapsed if elapsed else 0:.1f}/s), "
+              f"{self.attempts} requests, {self.retries} retries, final concurrency {limiter.limit}.")
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            p50 = latencies[int(0.50 * (len(latencies) - 1))]
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(f"Latency p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms.")
+        if self.failed:
+            print(f"{len(self.failed)} courses permanently failed: {', '.join(sorted(self.failed))}")
+
+
+async def fetch_course(session, course, manifest, base_url=BASE_URL, save=True):
+    """Make one download attempt and return the page; raises RetryableError on 429/5xx, None on other HTTP errors.
+
+    With save=False the page is only returned: nothing is read from or written to OUTPUT_DIR.
+    """
+    filename = os.path.join(OUTPUT_DIR, f"{course}.html")
+    exists = save and os.path.exists(filename)
 
     params = {
         "filter": "class",
@@ -47,33 +166,140 @@ async def fetch_course(session, course):
         "timetablename": "KFUEIT Fall 2025 Time Table",
         "sets": course
     }
-    try:
-        async with session.get(BASE_URL, headers=HEADERS, cookies=COOKIES, params=params) as resp:
-            if resp.status == 200:
-                html = await resp.text()
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(html)
+
+    headers = dict(HEADERS)
+    entry = manifest.get(course, {})
+    if exists:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    async with session.get(base_url, headers=headers, cookies=COOKIES, params=params) as resp:
+        if resp.status == 304:
+            print(f"[UNCHANGED] {course}: not modified")
+            with open(filename, "r", encoding="utf-8") as f:
+                html = f.read()
+        elif resp.status == 200:
+            html = await resp.text()
+            data = html.encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            known = entry.get("sha256")
+            if exists and known is None:
+                # Downloaded before the manifest existed: compare against the file on disk
+                with open(filename, "rb") as f:
+                    known = hashlib.sha256(f.read()).hexdigest()
+            if not save:
+                print(f"[OK] Fetched {course}")
+                return html
+            if exists and known == digest:
+                print(f"[UNCHANGED] {course}: same content")
+            else:
+                write_atomic(filename, data)
                 print(f"[OK] Saved {course}.html")
+            manifest[course] = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "sha256": digest,
+            }
+        elif resp.status == 429 or resp.status >= 500:
+            retry_after = resp.headers.get("Retry-After")
+            raise RetryableError(
+                f"HTTP {resp.status}", float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        else:
+            print(f"[ERROR] {course}: HTTP {resp.status}")
+            return None
+    return html
+
+
+async def download_course(session, course, manifest, limiter, report, refresh=False, base_url=BASE_URL, save=True):
+    """Fetch one course under the adaptive limiter, retrying with jittered exponential backoff.
+
+    Returns the page's HTML, or None if the course permanently failed.
+    """
+    filename = os.path.join(OUTPUT_DIR, f"{course}.html")
+
+    # Skip if file already exists, unless asked to revalidate it
+    if save and os.path.exists(filename) and not refresh:
+        print(f"[SKIP] {course}.html already exists")
+        with open(filename, "r", encoding="utf-8") as f:
+            return f.read()
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await limiter.acquire()
+        report.attempts += 1
+        started = time.monotonic()
+        error = None
+        try:
+            html = await fetch_course(session, course, manifest, base_url, save)
+        except RetryableError as e:
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = RetryableError(str(e) or type(e).__name__)
+        except Exception as e:  # e.g. a body that is not UTF-8 or a full disk: retrying will not help
+            print(f"[FAILED] {course}: {e!r}")
+            report.failed.append(course)
+            return None
+        finally:
+            latency = time.monotonic() - started
+            limiter.release(latency, overloaded=error is not None)
+
+        if error is None:
+            if html is None:
+                report.failed.append(course)
             else:
-                print(f"[ERROR] {course}: HTTP {resp.status}")
-    except Exception as e:
-        print(f"[FAILED] {course}: {e}")
+                report.latencies.append(latency)
+                report.completed += 1
+            return html
+
+        if attempt == MAX_ATTEMPTS:
+            break
+        delay = error.retry_after or random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        print(f"[RETRY] {course}: {error} (attempt {attempt}/{MAX_ATTEMPTS}, waiting {delay:.1f}s)")
+        report.retries += 1
+        await asyncio.sleep(delay)
+
+    print(f"[FAILED] {course}: {error}")
+    report.failed.append(course)
+    return None
 
 
 async def main():
+    parser = argparse.ArgumentParser(description="Download KFUEIT class timetables into course_htmls/.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="revalidate existing files with If-None-Match / If-Modified-Since instead of skipping them")
+    parser.add_argument("--base-url", default=BASE_URL, help="timetable endpoint (e.g. a local stand-in server)")
+    parser.add_argument("--max-concurrency", type=int, default=32,
+                        help="upper bound for the adaptive number of parallel requests")
+    args = parser.parse_args()
+
     # Read course list
     with open("courses.txt", "r") as f:
         courses = [line.strip() for line in f if line.strip()]
 
     print(f"Found {len(courses)} courses. Starting downloads...")
 
-    # Limit concurrency (avoid flooding server)
-    connector = aiohttp.TCPConnector(limit=10)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks = [fetch_course(session, course) for course in courses]
-        await asyncio.gather(*tasks)
+    manifest = load_manifest()
+
+    # Concurrency adapts to the server (avoid flooding it); the connector only caps the ceiling
+    limiter = AdaptiveLimiter(maximum=args.max_concurrency)
+    report = FetchReport()
+    connector = aiohttp.TCPConnector(limit=args.max_concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    started = time.monotonic()
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            tasks = [
+                download_course(session, course, manifest, limiter, report, args.refresh, args.base_url)
+                for course in courses
+            ]
+            await asyncio.gather(*tasks)
+    finally:
+        save_manifest(manifest)
 
     print("All downloads complete.")
+    report.print_summary(time.monotonic() - started, limiter)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,242 @@
+import argparse
+import json
+
+RESOLUTION = 5  # minutes per occupancy bit
+
+
+def span_mask(start, end):
+    """Bitmask of the RESOLUTION-minute buckets overlapping [start, end) minutes."""
+    first = start // RESOLUTION
+    last = -(-end // RESOLUTION)
+    return ((1 << max(0, last - first)) - 1) << first
+
+
+class OccupancyIndex:
+    """Per-day occupancy bitmasks for rooms and teachers at RESOLUTION-minute granularity.
+
+    Bit b of masks[name][day] is set when the entity is busy during [b * RESOLUTION, (b + 1) * RESOLUTION).
+    Room masks are also kept transposed: bit i of busy_rooms[day][b] is set when rooms[i] is busy in bucket b,
+    so a free-room query ORs the few buckets of its range and covers every room at once.
+    """
+
+    def __init__(self, days):
+        self.days = days
+        self.rooms = []
+        self.room_masks = {}
+        self.teacher_masks = {}
+        self.busy_rooms = [[0] * (24 * 60 // RESOLUTION) for _ in days]
+        self.first_minute = None
+        self.last_minute = None
+
+    @classmethod
+    def from_blocks(cls, teacher_blocks, room_blocks, days):
+        index = cls(days)
+        for masks, data_blocks in ((index.room_masks, room_blocks), (index.teacher_masks, teacher_blocks)):
+            for key, day_blocks in data_blocks.items():
+                if key == "Unknown Room":
+                    continue
+                day_masks = masks.setdefault(key, [0] * len(days))
+                for day, blocks in day_blocks.items():
+                    if day < 0:
+                        continue
+                    for session in blocks:
+                        day_masks[day] |= span_mask(session.start, session.end)
+                        if index.first_minute is None or session.start < index.first_minute:
+                            index.first_minute = session.start
+                        if index.last_minute is None or session.end > index.last_minute:
+                            index.last_minute = session.end
+
+        index.rooms = sorted(index.room_masks)
+        for i, room in enumerate(index.rooms):
+            bit = 1 << i
+            for day, mask in enumerate(index.room_masks[room]):
+                while mask:
+                    low = mask & -mask
+                    index.busy_rooms[day][low.bit_length() - 1] |= bit
+                    mask ^= low
+        return index
+
+    def free_rooms(self, day, start, end):
+        """Rooms with no session overlapping [start, end) minutes on the given day index."""
+        busy = 0
+        for bucket in range(start // RESOLUTION, -(-end // RESOLUTION)):
+            busy |= self.busy_rooms[day][bucket]
+        free = ((1 << len(self.rooms)) - 1) & ~busy
+        return [room for i, room in enumerate(self.rooms) if free >> i & 1]
+
+    def common_free(self, teachers, day, start=None, end=None):
+        """Free (start, end) minute intervals shared by all teachers on a day, within the teaching day."""
+        start = self.first_minute if start is None else start
+        end = self.last_minute if end is None else end
+        if start is None or end is None:
+            return []
+
+        busy = 0
+        for teacher in teachers:
+            busy |= self.teacher_masks[teacher][day]
+
+        intervals = []
+        run_start = None
+        for bucket in range(start // RESOLUTION, -(-end // RESOLUTION)):
+            if busy >> bucket & 1:
+                if run_start is not None:
+                    intervals.append((run_start, bucket * RESOLUTION))
+                    run_start = None
+            elif run_start is None:
+                run_start = max(start, bucket * RESOLUTION)
+        if run_start is not None:
+            intervals.append((run_start, end))
+        return intervals
+
+    def to_json(self):
+        """Compact export for the in-page finder: masks as hex, shifted to start at the first teaching minute."""
+        offset = (self.first_minute or 0) // RESOLUTION
+
+        def encode(masks):
+            return {name: [format(mask >> offset, "x") if mask else "" for mask in day_masks]
+                    for name, day_masks in sorted(masks.items())}
+
+        return {
+            "resolution": RESOLUTION,
+            "offset": offset,
+            "firstMinute": self.first_minute,
+            "lastMinute": self.last_minute,
+            "days": self.days,
+            "rooms": encode(self.room_masks),
+            "teachers": encode(self.teacher_masks),
+        }
+
+
+def build_free_slot_finder(index):
+    """Render the in-page free room / common free time finder backed by the exported index."""
+    days = "".join(f"<option value='{d}'>{day}</option>" for d, day in enumerate(index.days))
+    teachers = "".join(f"<option value='{t}'>{t}</option>" for t in sorted(index.teacher_masks))
+    index_json = json.dumps(index.to_json()).replace("</", "<\\/")
+    return f"""
+        <div class="form-row" id="freeSlotFinder" style="margin-top:20px;">
+            <div class="col-md-3">
+                <label>Free rooms on</label>
+                <select id="freeDay" class="form-control">{days}</select>
+                <input id="freeFrom" type="time" class="form-control" value="10:30">
+                <input id="freeTo" type="time" class="form-control" value="12:00">
+            </div>
+            <div class="col-md-3">
+                <label>Common free time of</label>
+                <select id="freeTeachers" class="form-control selectpicker" multiple data-live-search="true">{teachers}</select>
+            </div>
+            <div id="freeResult" class="col-md-3" style="max-width:600px;"></div>
+        </div>
+        <script>
+            const occupancy = {index_json};
+
+            function occupancyMask(hex) {{
+                return hex ? BigInt('0x' + hex) << BigInt(occupancy.offset) : 0n;
+            }}
+
+            function spanMask(start, end) {{
+                const first = Math.floor(start / occupancy.resolution), last = Math.ceil(end / occupancy.resolution);
+                return ((1n << BigInt(Math.max(0, last - first))) - 1n) << BigInt(first);
+            }}
+
+            function minutes(t) {{
+                const [h, m] = t.split(':').map(Number);
+                return h * 60 + m;
+            }}
+
+            function hhmm(m) {{
+                return String(Math.floor(m / 60)).padStart(2, '0') + ':' + String(m % 60).padStart(2, '0');
+            }}
+
+            function showFreeRooms() {{
+                const day = Number($('#freeDay').val());
+                const span = spanMask(minutes($('#freeFrom').val()), minutes($('#freeTo').val()));
+                const free = Object.keys(occupancy.rooms).filter(room => (occupancyMask(occupancy.rooms[room][day]) & span) === 0n);
+                $('#freeResult').html(`<p>${{free.length}} free rooms:</p><p>${{free.join(', ')}}</p>`);
+            }}
+
+            function showCommonFree() {{
+                const teachers = $('#freeTeachers').val() || [];
+                if (!teachers.length) return;
+                let html = '';
+                occupancy.days.forEach((dayName, day) => {{
+                    let busy = 0n;
+                    teachers.forEach(t => busy |= occupancyMask(occupancy.teachers[t][day]));
+                    const slots = [];
+                    let runStart = null;
+                    const first = Math.floor(occupancy.firstMinute / occupancy.resolution);
+                    const last = Math.ceil(occupancy.lastMinute / occupancy.resolution);
+                    for (let b = first; b < last; b++) {{
+                        if ((busy >> BigInt(b)) & 1n) {{
+                            if (runStart !== null) slots.push(hhmm(runStart) + ' - ' + hhmm(b * occupancy.resolution));
+                            runStart = null;
+                        }} else if (runStart === null) {{
+                            runStart = Math.max(occupancy.firstMinute, b * occupancy.resolution);
+                        }}
+                    }}
+                    if (runStart !== null) slots.push(hhmm(runStart) + ' - ' + hhmm(occupancy.lastMinute));
+                    html += `<p>${{dayName}}: ${{slots.join(', ') || '—'}}</p>`;
+                }});
+                $('#freeResult').html(html);
+            }}
+
+            $(document).ready(function() {{
+                $('#freeDay, #freeFrom, #freeTo').on('change', showFreeRooms);
+                $('#freeTeachers').on('changed.bs.select', showCommonFree);
+            }});
+        </script>
+"""
+
+
+def parse_day(text, days):
+    matches = [d for d, day in enumerate(days) if day.lower().startswith(text.lower())]
+    if len(matches) != 1:
+        raise argparse.ArgumentTypeError(f"unknown or ambiguous day: {text}")
+    return matches[0]
+
+
+def main():
+    from timetable_combiner import CACHE_FILE, DAYS, ParseCache, extract_tables, min_to_time, time_to_min
+
+    parser = argparse.ArgumentParser(description="Query free rooms and common free time from the extracted timetables.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rooms_cmd = commands.add_parser("free-rooms", help="rooms with nothing booked in a time range")
+    rooms_cmd.add_argument("--day", required=True, help="day name or prefix, e.g. Tue")
+    rooms_cmd.add_argument("--from", dest="start", required=True, help="HH:MM")
+    rooms_cmd.add_argument("--to", dest="end", required=True, help="HH:MM")
+
+    common_cmd = commands.add_parser("common-free", help="time when all given teachers are free")
+    common_cmd.add_argument("--teachers", required=True, help="comma-separated teacher names")
+    common_cmd.add_argument("--day", help="day name or prefix (default: every day)")
+    args = parser.parse_args()
+
+    cache = ParseCache(CACHE_FILE)
+    try:
+        _, teacher_blocks, _, room_blocks = extract_tables(cache=cache)
+    finally:
+        cache.close()
+    index = OccupancyIndex.from_blocks(teacher_blocks, room_blocks, DAYS)
+
+    try:
+        day = parse_day(args.day, DAYS) if args.day else None
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.command == "free-rooms":
+        free = index.free_rooms(day, time_to_min(args.start), time_to_min(args.end))
+        print(f"{len(free)} of {len(index.rooms)} rooms are free on {DAYS[day]} {args.start}-{args.end}:")
+        for room in free:
+            print(f"  {room}")
+        return
+
+    teachers = [name.strip() for name in args.teachers.split(",") if name.strip()]
+    unknown = [name for name in teachers if name not in index.teacher_masks]
+    if unknown:
+        parser.error(f"unknown teacher(s): {', '.join(unknown)}")
+    for d in ([day] if day is not None else range(len(DAYS))):
+        slots = index.common_free(teachers, d)
+        print(f"{DAYS[d]}: " + (", ".join(f"{min_to_time(s)} - {min_to_time(e)}" for s, e in slots) or "—"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import aiohttp
+
+import coursescraper
+from timetable_combiner import (
+    CONFLICTS_FILE, DEFAULT_BACKEND, PARSER_BACKENDS, add_sessions, new_block_map, parse_class_html,
+    report_conflicts, write_output,
+)
+from timetable_db import DB_FILE, export_database
+
+
+async def fetch_and_parse(courses, workers, backend=DEFAULT_BACKEND, save_html=False, refresh=False,
+                          base_url=coursescraper.BASE_URL, max_concurrency=32):
+    """Download every course and parse each page as soon as it arrives, overlapping network and CPU time.
+
+    Pages travel from the fetchers to a pool of parse workers through an asyncio queue; parse results
+    are merged into the block maps in courses.txt order as soon as each one is ready, so the output
+    does not depend on which download finished first.
+    """
+    class_tables = {}
+    teacher_blocks, course_blocks, room_blocks = new_block_map(), new_block_map(), new_block_map()
+
+    manifest = coursescraper.load_manifest() if save_html else {}
+    limiter = coursescraper.AdaptiveLimiter(maximum=max_concurrency)
+    report = coursescraper.FetchReport()
+    queue = asyncio.Queue(maxsize=workers * 4)
+    loop = asyncio.get_running_loop()
+
+    parsed = {}
+    next_to_merge = 0
+
+    def merge_ready():
+        nonlocal next_to_merge
+        while next_to_merge < len(courses) and next_to_merge in parsed:
+            result = parsed.pop(next_to_merge)
+            next_to_merge += 1
+            if result is None:
+                continue
+            class_name, table_html, sessions = result
+            class_tables[class_name] = table_html
+            add_sessions(sessions, teacher_blocks, course_blocks, room_blocks)
+
+    async def fetcher(idx, session):
+        html = await coursescraper.download_course(
+            session, courses[idx], manifest, limiter, report, refresh, base_url, save=save_html
+        )
+        if html is None:
+            parsed[idx] = None
+            merge_ready()
+        else:
+            await queue.put((idx, html))
+
+    async def parser(pool):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            idx, html = item
+            try:
+                parsed[idx] = await loop.run_in_executor(
+                    pool, partial(parse_class_html, html, f"{courses[idx]}.html", backend)
+                )
+            except Exception as e:  # one broken page must not stop this parser and stall the queue
+                print(f"[FAILED] {courses[idx]}: could not parse page: {e!r}")
+                report.failed.append(courses[idx])
+                parsed[idx] = None
+            merge_ready()
+
+    connector = aiohttp.TCPConnector(limit=max_concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsers = [asyncio.create_task(parser(pool)) for _ in range(workers)]
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                await asyncio.gather(*(fetcher(idx, session) for idx in range(len(courses))))
+            for _ in parsers:
+                await queue.put(None)
+            await asyncio.gather(*parsers)
+        finally:
+            for task in parsers:
+                task.cancel()
+            if save_html:
+                coursescraper.save_manifest(manifest)
+
+    return (class_tables, teacher_blocks, course_blocks, room_blocks), report, limiter
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download and parse KFUEIT class timetables concurrently, then build the combined page."
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="parse worker processes (default: CPU count)")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+                        help=f"HTML parser backend (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--save-html", action="store_true",
+                        help=f"also keep the downloaded pages in {coursescraper.OUTPUT_DIR}/ (reusing existing ones)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="with --save-html, revalidate existing pages instead of reusing them")
+    parser.add_argument("--base-url", default=coursescraper.BASE_URL, help="timetable endpoint")
+    parser.add_argument("--max-concurrency", type=int, default=32,
+                        help="upper bound for the adaptive number of parallel requests")
+    output_mode = parser.add_mutually_exclusive_group()
+    output_mode.add_argument("--data-only", action="store_true",
+                             help="embed one deduplicated session dataset and render the tables in the browser")
+    output_mode.add_argument("--sharded", action="store_true",
+                             help="write an index page plus one precompressed JSON fragment per entity")
+    parser.add_argument("--highlight-conflicts", action="store_true",
+                        help=f"outline double-booked sessions in the tables (always listed in {CONFLICTS_FILE})")
+    parser.add_argument("--free-slots", action="store_true",
+                        help="embed the room/teacher occupancy index and a free room / common free time finder")
+    parser.add_argument("--export-db", nargs="?", const=DB_FILE, metavar="PATH",
+                        help=f"also upsert all sessions into an indexed SQLite database (default PATH: {DB_FILE})")
+    args = parser.parse_args()
+
+    with open("courses.txt", "r") as f:
+        courses = [line.strip() for line in f if line.strip()]
+
+    print(f"Found {len(courses)} courses. Fetching and parsing...")
+    started = time.monotonic()
+    blocks, report, limiter = asyncio.run(fetch_and_parse(
+        courses, max(1, args.jobs), args.parser, args.save_html, args.refresh, args.base_url, args.max_concurrency
+    ))
+    report.print_summary(time.monotonic() - started, limiter)
+
+    class_tables, teacher_blocks, course_blocks, room_blocks = blocks
+    print(f"Found {len(class_tables)} classes, {len(teacher_blocks)} teachers, {len(course_blocks)} courses, and {len(room_blocks)} rooms.")
+    conflicts = report_conflicts(teacher_blocks, room_blocks)
+    if args.export_db:
+        export_database(args.export_db, class_tables, course_blocks)
+    write_output(class_tables, teacher_blocks, course_blocks, room_blocks,
+                 data_only=args.data_only, sharded=args.sharded,
+                 conflicts=conflicts if args.highlight_conflicts else None, free_slots=args.free_slots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import os
+import random
+
+from timetable_combiner import FIXED_TIMES, INPUT_DIR, SLOT_SIZE, min_to_time, time_to_min
+
+PAGE_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+TEACHER_TITLES = ["Dr.", "Mr.", "Ms.", "Engr."]
+DEPARTMENTS = ["COSC", "SWEN", "ITEC", "DSCI", "MATH"]
+PRAYER_BREAK = "<td rowspan=1 class='breaktime'><br>Friday Prayer<br/>13:30 - 14:00</td>"
+
+
+def class_page(class_name, cells):
+    """Render a class page the way my.kfueit.edu.pk serves it; cells maps (slot, day) to (rowspan, lines)."""
+    covered = set()
+    rows = []
+    for slot, start in enumerate(FIXED_TIMES):
+        row = [f"<td class='timeside'><p>{start}</p></td>"]
+        for d, day in enumerate(PAGE_DAYS):
+            if (slot, d) in covered:
+                continue
+            if (slot, d) in cells:
+                rowspan, lines = cells[slot, d]
+                covered.update((slot + k, d) for k in range(1, rowspan))
+                row.append(f"<td rowspan={rowspan} class='lightgreen'>{'<br>'.join(lines)}</td>")
+            elif day == "Friday" and start == "13:30":
+                row.append(PRAYER_BREAK)
+            else:
+                row.append("<td class='fixedheight'> --- </td>")
+        rows.append("<tr>" + "".join(row) + "</tr>\n")
+
+    header = "".join(f"<th>{day}</th>" for day in PAGE_DAYS)
+    return f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>KFUEIT Time Table</title></head>
+<body>
+<div class="container">
+<p>Class: {class_name}</p>
+<table class="table table-bordered time_table" width="100%">
+<tr><td colspan="{len(PAGE_DAYS) + 1}"><h3 align="center" class="kf_heading">KFUEIT Time Table</h3></td></tr>
+<tr class='time_table_heading'><th class='corner_box'><p>Day</p><span>Time</span></th>{header}</tr>
+{"".join(rows)}</table>
+</div>
+</body>
+</html>
+"""
+
+
+def _pick(rng, pool, busy, slots, attempts=8):
+    """Pick a teacher or room that is free in all slots if a few random draws find one, and book it.
+
+    Like the real timetable, this leaves only the occasional double booking.
+    """
+    for _ in range(attempts):
+        choice = rng.choice(pool)
+        if not any((choice, d, s) in busy for d, s in slots):
+            break
+    busy.update((choice, d, s) for d, s in slots)
+    return choice
+
+
+def generate_corpus(out_dir=INPUT_DIR, n_classes=345, n_teachers=None, n_rooms=None, n_courses=None, seed=0,
+                    fill_rate=0.6, lab_rate=0.1, multi_teacher_rate=0.15, shared_rate=0.25):
+    """Write n_classes synthetic class pages into out_dir and return their paths.
+
+    Pages follow the KFUEIT layout: 90-minute slots, labs spanning two rows via rowspan, cells with
+    several teachers, the Friday prayer break, and lectures shared by several classes (identical
+    cells on different pages, merged into ×N blocks by the combiner). Teachers and rooms are mostly
+    picked where they are free. Teacher, room and course counts default to scaling with n_classes.
+    """
+    rng = random.Random(seed)
+    n_teachers = n_teachers or max(1, n_classes)
+    n_rooms = n_rooms or max(1, n_classes * 2 // 3)
+    n_courses = n_courses or max(1, n_classes)
+    teachers = [f"{rng.choice(TEACHER_TITLES)} Teacher {i}" for i in range(n_teachers)]
+    rooms = [f"{rng.choice(DEPARTMENTS)}.{rng.randint(1, 3)}.{i:02d}{rng.choice('RL')}" for i in range(n_rooms)]
+    courses = [f"{rng.choice(DEPARTMENTS)}-{1000 + i}-Course {i}" for i in range(n_courses)]
+    slot_starts = [time_to_min(t) for t in FIXED_TIMES]
+
+    os.makedirs(out_dir, exist_ok=True)
+    shared = {}  # (slot, day, rowspan) -> lines of the last lecture there, for combined classes
+    busy = set()  # (teacher or room, day, slot) already booked
+    paths = []
+    for c in range(n_classes):
+        class_name = f"BS-{DEPARTMENTS[c % len(DEPARTMENTS)]}-{c // len(DEPARTMENTS) + 1}{'ABC'[c % 3]}"
+        cells = {}
+        for d, day in enumerate(PAGE_DAYS):
+            slot = 0
+            while slot < len(FIXED_TIMES):
+                if (day == "Friday" and FIXED_TIMES[slot] == "13:30") or rng.random() > fill_rate:
+                    slot += 1
+                    continue
+                rowspan = 2 if slot + 1 < len(FIXED_TIMES) and rng.random() < lab_rate else 1
+                if day == "Friday" and "13:30" in FIXED_TIMES[slot:slot + rowspan]:
+                    rowspan = 1
+                key = (slot, d, rowspan)
+                if key in shared and rng.random() < shared_rate:
+                    lines = shared[key]
+                else:
+                    start = slot_starts[slot]
+                    slots = [(d, s) for s in range(slot, slot + rowspan)]
+                    n = 2 if rng.random() < multi_teacher_rate else 1
+                    lines = [
+                        rng.choice(courses),
+                        *(_pick(rng, teachers, busy, slots) for _ in range(min(n, len(teachers)))),
+                        _pick(rng, rooms, busy, slots),
+                        f"{min_to_time(start)} - {min_to_time(start + rowspan * SLOT_SIZE)}",
+                    ]
+                    shared[key] = lines
+                cells[slot, d] = (rowspan, lines)
+                slot += rowspan
+
+        path = os.path.join(out_dir, f"{class_name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(class_page(class_name, cells))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic KFUEIT-format class timetable pages.")
+    parser.add_argument("-o", "--output", default=INPUT_DIR, help=f"output folder (default: {INPUT_DIR})")
+    parser.add_argument("--classes", type=int, default=345, help="number of class pages")
+    parser.add_argument("--teachers", type=int, help="teacher pool size (default: classes)")
+    parser.add_argument("--rooms", type=int, help="room pool size (default: 2/3 of classes)")
+    parser.add_argument("--courses", type=int, help="course pool size (default: classes)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.output, args.classes, args.teachers, args.rooms, args.courses, args.seed)
+    print(f"Wrote {len(paths)} class pages to {args.output}/.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import hashlib
+import os
+from collections import Counter
+from email.utils import formatdate
+
+from aiohttp import web
+
+PATH = "/users/testtable"
+
+
+class StandinTimetable:
+    """A local stand-in for the KFUEIT timetable endpoint, for exercising coursescraper and pipeline.
+
+    pages maps a class (the "sets" query parameter) to its page (str, or bytes to serve as-is) and
+    may be changed while serving.
+    Responses carry an ETag and Last-Modified (unless etag=False) and honour If-None-Match with a 304.
+    failures maps a class to the statuses to answer with before the page is served. statuses counts
+    the responses per (class, status).
+    """
+
+    def __init__(self, pages, etag=True, failures=None):
+        self.pages = pages
+        self.etag = etag
+        self.failures = {course: list(statuses) for course, statuses in (failures or {}).items()}
+        self.statuses = Counter()
+        self.last_modified = formatdate(usegmt=True)
+
+    async def handle(self, request):
+        course = request.query.get("sets", "")
+        response = self.respond(request, course)
+        self.statuses[course, response.status] += 1
+        return response
+
+    def respond(self, request, course):
+        if self.failures.get(course):
+            return web.Response(status=self.failures[course].pop(0), headers={"Retry-After": "0"})
+        if course not in self.pages:
+            return web.Response(status=404)
+
+        page = self.pages[course]
+        body = page if isinstance(page, bytes) else page.encode("utf-8")
+        headers = {}
+        if self.etag:
+            headers["ETag"] = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            headers["Last-Modified"] = self.last_modified
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="text/html", charset="utf-8", headers=headers)
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get(PATH, self.handle)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Serve in the running event loop; return (runner, base_url) and clean up with runner.cleanup()."""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = runner.addresses[0][1]
+        return runner, f"http://{host}:{port}{PATH}"
+
+
+def load_pages(folder):
+    pages = {}
+    for filename in os.listdir(folder):
+        if filename.endswith(".html"):
+            with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+                pages[filename[:-len(".html")]] = f.read()
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve class pages from a folder like the KFUEIT timetable endpoint.")
+    parser.add_argument("pages", help="folder of <class>.html pages, e.g. one written by synthetic_corpus.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--no-etag", action="store_true", help="send neither ETag nor Last-Modified")
+    args = parser.parse_args()
+
+    standin = StandinTimetable(load_pages(args.pages), etag=not args.no_etag)
+    print(f"Use --base-url http://{args.host}:{args.port}{PATH}")
+    web.run_app(standin.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
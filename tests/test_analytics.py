@@ -0,0 +1,59 @@
+import pytest
+
+from timetable_combiner import Session, add_sessions, new_block_map
+
+np = pytest.importorskip("numpy")
+import analytics  # noqa: E402
+
+
+def session_columns(sessions):
+    columns = analytics.SessionColumns()
+    add_sessions(sessions, new_block_map(), new_block_map(), new_block_map(), columns)
+    return columns
+
+
+def test_shared_lecture_counts_once_for_rooms_and_teachers():
+    lecture = Session(0, 540, 630, "Calculus", ("Dr. A", "Mr. B"), "Room 1", "BS-1A")
+    sessions = [
+        lecture,
+        lecture._replace(class_name="BS-1B"),  # the same lecture, shared by another class
+        Session(0, 600, 690, "Physics", ("Dr. A", "Dr. A"), "Unknown Room", "BS-1A"),  # teacher named twice
+        Session(-1, 0, 0, "Thesis", ("Mr. B",), "Room 1", "BS-1B"),  # not on a weekday
+    ]
+    rooms, teachers, classes = analytics.lecture_spans(session_columns(sessions))
+
+    assert rooms[0] == ["Room 1"]
+    assert len(rooms[1]) == 1
+    assert teachers[0] == ["Dr. A", "Mr. B"]
+    assert np.bincount(teachers[1]).tolist() == [2, 1]
+    assert classes[0] == ["BS-1A", "BS-1B"]
+    assert np.bincount(classes[1]).tolist() == [2, 1]
+
+
+def test_report_hours():
+    sessions = [
+        Session(0, 540, 630, "Calculus", ("Dr. A",), "Room 1", "BS-1A"),
+        Session(0, 540, 630, "Calculus", ("Dr. A",), "Room 1", "BS-1B"),
+        Session(1, 540, 720, "Physics", ("Dr. A",), "Room 2", "BS-1A"),
+    ]
+    report = analytics.utilisation_report(session_columns(sessions))
+
+    assert report["rooms"]["Room 1"]["hours"] == 1.5
+    assert report["rooms"]["Room 2"]["hours"] == 3.0
+    assert report["teacherLoad"]["Dr. A"] == {"Monday": 1.5, "Tuesday": 3.0}
+    assert report["classHours"] == {"BS-1A": 4.5, "BS-1B": 1.5}
+
+
+def test_columns_from_blocks_match_merge_time_columns():
+    sessions = [
+        Session(0, 540, 630, "Calculus", ("Dr. A", "Mr. B"), "Room 1", "BS-1A"),
+        Session(0, 540, 630, "Calculus", ("Dr. A", "Mr. B"), "Room 1", "BS-1B"),
+        Session(2, 600, 690, "Physics", (), "Room 2", "BS-1A"),
+    ]
+    course_blocks = new_block_map()
+    add_sessions(sessions, new_block_map(), course_blocks, new_block_map())
+    rebuilt = analytics.utilisation_report(analytics.SessionColumns.from_blocks(course_blocks))
+    merged = analytics.utilisation_report(session_columns(sessions))
+    rebuilt.pop("timing_ms"), merged.pop("timing_ms")
+
+    assert rebuilt == merged
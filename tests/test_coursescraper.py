@@ -0,0 +1,162 @@
+import asyncio
+import errno
+import importlib
+import os
+
+import aiohttp
+import pytest
+
+from standin_server import StandinTimetable
+
+PAGE = "<html><body><p>Class: BS-TEST-1A</p><table class='time_table'></table></body></html>"
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    """coursescraper, working in an empty folder (it creates course_htmls/ relative to the cwd on import)."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("course_htmls")
+    import coursescraper
+    return importlib.reload(coursescraper)
+
+
+def download(scraper, standin, course, manifest, refresh=False):
+    """Fetch one course from the stand-in through download_course; return the page."""
+
+    async def run():
+        runner, base_url = await standin.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await scraper.download_course(
+                    session, course, manifest, scraper.AdaptiveLimiter(), scraper.FetchReport(), refresh, base_url
+                )
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def download_all(scraper, standin, courses):
+    """Fetch courses concurrently from the stand-in, as main() does; return the pages and the FetchReport."""
+
+    async def run():
+        runner, base_url = await standin.start()
+        report = scraper.FetchReport()
+        try:
+            async with aiohttp.ClientSession() as session:
+                pages = await asyncio.gather(*(
+                    scraper.download_course(session, course, {}, scraper.AdaptiveLimiter(), report, False, base_url)
+                    for course in courses
+                ))
+        finally:
+            await runner.cleanup()
+        return pages, report
+
+    return asyncio.run(run())
+
+
+def test_download_saves_page_and_manifest_entry(scraper):
+    standin = StandinTimetable({"BS-TEST-1A": PAGE})
+    manifest = {}
+
+    assert download(scraper, standin, "BS-TEST-1A", manifest) == PAGE
+    with open("course_htmls/BS-TEST-1A.html", encoding="utf-8") as f:
+        assert f.read() == PAGE
+    assert manifest["BS-TEST-1A"]["etag"] and manifest["BS-TEST-1A"]["sha256"]
+    assert standin.statuses["BS-TEST-1A", 200] == 1
+
+
+def test_refresh_of_unchanged_page_is_a_304(scraper, capsys):
+    standin = StandinTimetable({"BS-TEST-1A": PAGE})
+    manifest = {}
+    download(scraper, standin, "BS-TEST-1A", manifest)
+    before = os.stat("course_htmls/BS-TEST-1A.html")
+
+    assert download(scraper, standin, "BS-TEST-1A", manifest, refresh=True) == PAGE
+    assert standin.statuses["BS-TEST-1A", 304] == 1
+    assert "not modified" in capsys.readouterr().out
+    assert os.stat("course_htmls/BS-TEST-1A.html").st_ino == before.st_ino
+
+
+def test_refresh_with_same_content_leaves_file_alone(scraper, capsys):
+    standin = StandinTimetable({"BS-TEST-1A": PAGE}, etag=False)
+    manifest = {}
+    download(scraper, standin, "BS-TEST-1A", manifest)
+    before = os.stat("course_htmls/BS-TEST-1A.html")
+
+    assert download(scraper, standin, "BS-TEST-1A", manifest, refresh=True) == PAGE
+    assert standin.statuses["BS-TEST-1A", 200] == 2
+    assert "same content" in capsys.readouterr().out
+    after = os.stat("course_htmls/BS-TEST-1A.html")
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_refresh_with_new_content_replaces_file(scraper):
+    standin = StandinTimetable({"BS-TEST-1A": PAGE})
+    manifest = {}
+    download(scraper, standin, "BS-TEST-1A", manifest)
+    old_sha = manifest["BS-TEST-1A"]["sha256"]
+
+    standin.pages["BS-TEST-1A"] = PAGE.replace("BS-TEST-1A", "BS-TEST-1B")
+    download(scraper, standin, "BS-TEST-1A", manifest, refresh=True)
+    with open("course_htmls/BS-TEST-1A.html", encoding="utf-8") as f:
+        assert "BS-TEST-1B" in f.read()
+    assert manifest["BS-TEST-1A"]["sha256"] != old_sha
+
+
+def test_retries_server_errors(scraper, monkeypatch):
+    monkeypatch.setattr(scraper, "BACKOFF_BASE", 0.0)
+    standin = StandinTimetable({"BS-TEST-1A": PAGE}, failures={"BS-TEST-1A": [503, 429]})
+
+    assert download(scraper, standin, "BS-TEST-1A", {}) == PAGE
+    assert standin.statuses["BS-TEST-1A", 503] == standin.statuses["BS-TEST-1A", 429] == 1
+
+
+def test_write_atomic_replaces_whole_file(scraper):
+    path = os.path.join("course_htmls", "page.html")
+    scraper.write_atomic(path, b"old")
+    scraper.write_atomic(path, b"new")
+    with open(path, "rb") as f:
+        assert f.read() == b"new"
+    assert os.listdir("course_htmls") == ["page.html"]
+
+
+def test_write_atomic_keeps_old_file_when_interrupted(scraper, monkeypatch):
+    path = os.path.join("course_htmls", "page.html")
+    scraper.write_atomic(path, b"old")
+
+    def interrupted(src, dst):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(scraper.os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        scraper.write_atomic(path, b"new")
+    with open(path, "rb") as f:
+        assert f.read() == b"old"
+    assert os.listdir("course_htmls") == ["page.html"]  # no temp file left behind
+
+
+def test_undecodable_page_fails_only_its_course(scraper, capsys):
+    standin = StandinTimetable({"BS-TEST-1A": PAGE, "BS-TEST-1B": b"\xff\xfe<html>broken</html>", "BS-TEST-1C": PAGE})
+
+    pages, report = download_all(scraper, standin, ["BS-TEST-1A", "BS-TEST-1B", "BS-TEST-1C"])
+    assert pages == [PAGE, None, PAGE]
+    assert report.failed == ["BS-TEST-1B"]
+    assert standin.statuses["BS-TEST-1B", 200] == 1  # not retried
+    assert "[FAILED] BS-TEST-1B" in capsys.readouterr().out
+
+
+def test_full_disk_fails_only_its_course(scraper, monkeypatch):
+    write_atomic = scraper.write_atomic
+
+    def disk_full(path, data):
+        if "BS-TEST-1B" in path:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        write_atomic(path, data)
+
+    monkeypatch.setattr(scraper, "write_atomic", disk_full)
+    standin = StandinTimetable({"BS-TEST-1A": PAGE, "BS-TEST-1B": PAGE})
+    pages, report = download_all(scraper, standin, ["BS-TEST-1A", "BS-TEST-1B"])
+    assert pages == [PAGE, None]
+    assert report.failed == ["BS-TEST-1B"]
+    assert os.listdir("course_htmls") == ["BS-TEST-1A.html"]
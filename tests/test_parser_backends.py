@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+import timetable_combiner
+from synthetic_corpus import generate_corpus
+from timetable_combiner import PARSER_BACKENDS, compare_backends, parse_class_html
+
+# Pages as they come back from the scraper or a hand edit, and what they do to the markup
+QUIRKS = {
+    "xml_declaration": lambda page: '<?xml version="1.0" encoding="utf-8"?>\n' + page,
+    "unclosed_tr": lambda page: page.replace("</tr>", ""),
+    "unclosed_empty_td": lambda page: page.replace("<td class='fixedheight'> --- </td>", "<td class='fixedheight'> --- "),
+    "unclosed_lesson_td": lambda page: re.sub(r"(<td rowspan=\d class='lightgreen'>[^<]*(?:<br>[^<]*)*)</td>", r"\1", page),
+    "unclosed_td_and_tr": lambda page: page.replace("</td>", "").replace("</tr>", ""),
+}
+
+
+@pytest.fixture(scope="module")
+def pages(tmp_path_factory):
+    paths = generate_corpus(str(tmp_path_factory.mktemp("corpus")), n_classes=40, seed=3)
+    result = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            result.append(f.read())
+    return result
+
+
+def test_backends_agree_on_synthetic_corpus(pages):
+    for page in pages:
+        expected = parse_class_html(page, "page.html", "bs4")
+        assert expected[2], "the corpus should produce sessions"
+        # strainer builds a subset of the same tree, so even the raw class table is identical
+        assert parse_class_html(page, "page.html", "strainer") == expected
+        if "lxml" in PARSER_BACKENDS:
+            class_name, _, sessions = parse_class_html(page, "page.html", "lxml")
+            assert (class_name, sessions) == (expected[0], expected[2])
+
+
+@pytest.mark.parametrize("quirk", sorted(QUIRKS))
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_backends_read_quirky_pages_like_clean_ones(pages, quirk, backend):
+    for page in pages[:10]:
+        class_name, _, sessions = parse_class_html(page, "page.html", "bs4")
+        result = parse_class_html(QUIRKS[quirk](page), "page.html", backend)
+        assert (result[0], result[2]) == (class_name, sessions)
+
+
+def test_compare_backends_reports_every_backend(tmp_path, monkeypatch, capsys):
+    generate_corpus(str(tmp_path / "course_htmls"), n_classes=5, seed=1)
+    monkeypatch.chdir(tmp_path)
+
+    def broken(markup):
+        heading, table_html, day_headers, rows = PARSER_BACKENDS["bs4"](markup)
+        return heading, table_html, day_headers[1:], rows  # every session shifted by a day
+
+    monkeypatch.setattr(timetable_combiner, "PARSER_BACKENDS",
+                        {"bs4": PARSER_BACKENDS["bs4"], "broken": broken, "strainer": PARSER_BACKENDS["strainer"]})
+    assert not compare_backends()
+    out = capsys.readouterr().out
+    assert "[MISMATCH] broken" in out
+    assert "[OK] strainer matches bs4" in out
@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+import pytest
+
+from standin_server import StandinTimetable
+from synthetic_corpus import generate_corpus
+
+# A time_table without its day header row, which parse_class_html cannot read
+BROKEN_PAGE = "<html><body><p>Class: BS-BROKEN</p><table class='time_table'><tr><td>x</td></tr></table></body></html>"
+UNDECODABLE_PAGE = b"\xff\xfe<html>not UTF-8</html>"  # fails in the fetcher, before parsing
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("course_htmls")
+    import pipeline
+    return pipeline
+
+
+def fetch_and_parse(pipeline, pages, courses, workers):
+    async def run():
+        runner, base_url = await StandinTimetable(pages).start()
+        try:
+            return await asyncio.wait_for(pipeline.fetch_and_parse(courses, workers, base_url=base_url), 60)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("broken", [BROKEN_PAGE, UNDECODABLE_PAGE], ids=["unparsable", "undecodable"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_broken_page_is_reported_and_the_rest_merged(pipeline, tmp_path, workers, broken):
+    pages = {}
+    for path in generate_corpus(str(tmp_path / "corpus"), n_classes=4, seed=1):
+        with open(path, encoding="utf-8") as f:
+            pages[os.path.basename(path)[:-len(".html")]] = f.read()
+    courses = sorted(pages)
+    courses.insert(1, "BS-BROKEN")
+    pages["BS-BROKEN"] = broken
+
+    (class_tables, teacher_blocks, _, _), report, _ = fetch_and_parse(pipeline, pages, courses, workers)
+
+    assert report.failed == ["BS-BROKEN"]
+    assert len(class_tables) == 4
+    assert teacher_blocks
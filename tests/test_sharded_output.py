@@ -0,0 +1,30 @@
+import os
+
+import timetable_combiner
+
+
+def count_compressions(monkeypatch):
+    calls = []
+    compress = timetable_combiner.gzip.compress
+    monkeypatch.setattr(timetable_combiner.gzip, "compress", lambda data, **kw: calls.append(data) or compress(data, **kw))
+    return calls
+
+
+def test_unchanged_shards_are_not_recompressed(tmp_path, monkeypatch):
+    out_dir = str(tmp_path)
+    tables = {"Dr. A": "<table>A</table>", "Mr. B": "<table>B</table>"}
+    timetable_combiner.write_sharded_output(out_dir, {}, tables, {}, {})
+
+    calls = count_compressions(monkeypatch)
+    tables["Mr. B"] = "<table>B, changed</table>"
+    timetable_combiner.write_sharded_output(out_dir, {}, tables, {}, {})
+    assert calls == [b'"<table>B, changed</table>"']  # not Dr. A's shard, not the unchanged index
+
+
+def test_full_write_removes_stale_shards(tmp_path):
+    out_dir = str(tmp_path)
+    timetable_combiner.write_sharded_output(out_dir, {}, {"Dr. A": "a", "Mr. B": "b"}, {}, {})
+    timetable_combiner.write_sharded_output(out_dir, {}, {"Dr. A": "a"}, {}, {})
+
+    files = os.listdir(os.path.join(out_dir, "shards", "teacher"))
+    assert len(files) == (3 if timetable_combiner.brotli else 2)  # Dr. A's .json, .gz and .br
@@ -0,0 +1,113 @@
+import argparse
+import gzip
+import os
+import shutil
+
+import pytest
+
+import timetable_combiner
+from synthetic_corpus import generate_corpus
+
+ARGS = dict(no_cache=True, rebuild_cache=False, parser=timetable_combiner.DEFAULT_BACKEND, jobs=1,
+            highlight_conflicts=True, export_db=None, data_only=False, sharded=False, free_slots=False)
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """An IncrementalBuild loaded from a small synthetic corpus in an empty folder."""
+    monkeypatch.chdir(tmp_path)
+    generate_corpus(timetable_combiner.INPUT_DIR, n_classes=12, seed=5)
+    incremental = timetable_combiner.IncrementalBuild(argparse.Namespace(**ARGS))
+    incremental.load()
+    yield incremental
+    incremental.close()
+
+
+def page(name):
+    return os.path.join(timetable_combiner.INPUT_DIR, name)
+
+
+def assert_matches_full_rebuild(incremental):
+    full = timetable_combiner.IncrementalBuild(argparse.Namespace(**ARGS))
+    full.load()
+    assert incremental.class_tables == full.class_tables
+    assert incremental.blocks == full.blocks
+    assert incremental.tables == full.tables
+    assert incremental.conflicts == full.conflicts
+
+
+def test_renamed_page_keeps_its_class(build):
+    name = sorted(os.listdir(timetable_combiner.INPUT_DIR))[-1]
+    os.rename(page(name), page("0" + name))  # the new path sorts before the old one
+    build.update({page(name), page("0" + name)})
+
+    assert name[:-len(".html")] in build.class_tables
+    assert_matches_full_rebuild(build)
+
+
+def test_duplicate_class_name_follows_directory_order(build):
+    first, second = sorted(os.listdir(timetable_combiner.INPUT_DIR))[:2]
+    with open(page(first), encoding="utf-8") as f:
+        class_line = next(line for line in f if line.startswith("<p>Class:"))
+    with open(page(second), encoding="utf-8") as f:
+        html = f.read()
+    with open(page("copy.html"), "w", encoding="utf-8") as f:
+        f.write(html.replace(next(line for line in html.splitlines() if line.startswith("<p>Class:")),
+                             class_line.strip()))
+    build.update({page("copy.html")})
+    assert_matches_full_rebuild(build)
+
+    os.remove(page("copy.html"))
+    build.update({page("copy.html")})
+    assert_matches_full_rebuild(build)
+
+
+def test_changed_pages_match_full_rebuild(build, tmp_path):
+    names = sorted(os.listdir(timetable_combiner.INPUT_DIR))
+    generate_corpus(str(tmp_path / "other"), n_classes=12, seed=6)
+    shutil.copy(tmp_path / "other" / names[3], page(names[3]))
+    os.remove(page(names[5]))
+    build.update({page(names[3]), page(names[5])})
+    assert_matches_full_rebuild(build)
+
+
+def shard_tree():
+    tree = {}
+    for folder, _, filenames in os.walk(timetable_combiner.SHARD_DIR):
+        for filename in filenames:
+            with open(os.path.join(folder, filename), "rb") as f:
+                data = f.read()
+            tree[os.path.join(folder, filename)] = gzip.decompress(data) if filename.endswith(".gz") else data
+    return tree
+
+
+def test_sharded_update_rewrites_only_touched_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generate_corpus(timetable_combiner.INPUT_DIR, n_classes=12, seed=5)
+    args = argparse.Namespace(**dict(ARGS, sharded=True, highlight_conflicts=False))
+    incremental = timetable_combiner.IncrementalBuild(args)
+    incremental.load()
+    written = []
+    write_precompressed = timetable_combiner.write_precompressed
+    monkeypatch.setattr(timetable_combiner, "write_precompressed",
+                        lambda path, data: written.append(path) if write_precompressed(path, data) else None)
+    name = sorted(os.listdir(timetable_combiner.INPUT_DIR))[0]
+    class_name, _, sessions = incremental.results[page(name)]
+    touched = {("class", class_name)} | {entity for session in sessions for entity in incremental.entities(session)}
+    os.remove(page(name))  # its class, and maybe some teachers, courses and rooms, disappear
+    incremental.update({page(name)})
+    incremental.close()
+
+    # Other shards keep their paths, so they are not rewritten even though names went away
+    index = os.path.join(timetable_combiner.SHARD_DIR, "index.html")
+    assert index in written
+    assert set(written) <= {index} | {
+        os.path.join(timetable_combiner.SHARD_DIR, timetable_combiner.shard_path(view, name)) for view, name in touched
+    }
+
+    patched = shard_tree()
+    shutil.rmtree(timetable_combiner.SHARD_DIR)
+    full = timetable_combiner.IncrementalBuild(args)
+    full.load()
+    full.close()
+    assert patched == shard_tree()
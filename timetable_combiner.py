@@ -1,11 +1,81 @@
 import os
-from bs4 import BeautifulSoup
-from collections import defaultdict
+import sys
+import argparse
+import cProfile
+import gzip
+import hashlib
+import heapq
+import pstats
+import sqlite3
+import tempfile
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import attrgetter, itemgetter
 import re
 import json
 
+from free_slots import OccupancyIndex, build_free_slot_finder
+from timetable_db import DB_FILE, export_database
+
+try:
+    import lxml.html
+except ImportError:  # optional fast-path parser backend
+    lxml = None
+
+try:
+    import brotli
+except ImportError:  # optional, only needed for .br siblings of sharded output
+    brotli = None
+
+try:
+    import pyinstrument
+except ImportError:  # optional, only needed for --profile pyinstrument
+    pyinstrument = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as 0
+    resource = None
+
+try:
+    import inotify_simple
+except ImportError:  # optional, --watch polls the input folder without it
+    inotify_simple = None
+
 INPUT_DIR = "course_htmls"
 OUTPUT_FILE = "all_timetables.html"
+SHARD_DIR = "all_timetables"
+BROTLI_QUALITY = 5  # quality 11 takes ~100x longer for ~8% smaller shards, on every rebuild
+CONFLICTS_FILE = "conflicts.json"
+CONFLICT_COLOR = "#ff5252"
+CACHE_FILE = "course_htmls.cache.sqlite"
+METRICS_FILE = "build_metrics.json"
+PROFILE_FILE = "timetable_combiner.prof"  # cProfile stats; pyinstrument writes timetable_combiner.profile.html
+CACHE_VERSION = 4
+# Same output as bs4; lxml is opt-in because it reserialises the class tables differently (e.g. <br> for <br/>)
+DEFAULT_BACKEND = "strainer"
+SPILL_RUN_BYTES = 1024 * 1024  # JSON records sorted in memory before --low-memory spills them as a run
+SPILL_MERGE_FANIN = 64  # runs merged at once; more runs are first merged into fewer, longer ones
+SPILL_BATCH_FILES = 64  # class pages parsed per batch in --low-memory builds
+WATCH_DEBOUNCE = 0.2  # seconds without further writes that end a burst of changes
+WATCH_POLL_INTERVAL = 0.5  # seconds between folder scans when inotify is unavailable
+
+# Standard KFUEIT slots: always on the grid, further rows are added for sessions off these boundaries
+FIXED_TIMES = ["09:00", "10:30", "12:00", "13:30", "15:00"]
+SLOT_SIZE = 90  # minutes per slot
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {day: d for d, day in enumerate(DAYS)}
+TIME_RANGE_RE = re.compile(r"(\d{2}):(\d{2})\s*-\s*(\d{2}):(\d{2})")
+
+# One teaching session of one class: day is an index into DAYS (-1 for columns that are not a weekday,
+# which are kept so the entity still gets a table but are never placed on the grid),
+# start/end are minutes since midnight
+Session = namedtuple("Session", ["day", "start", "end", "course", "teachers", "room", "class_name"])
 
 
 def time_to_min(t):
@@ -14,201 +84,781 @@ def time_to_min(t):
     return h * 60 + m
 
 
-def extract_tables():
-    """Parse all class timetables and collect teacher, course, and room schedules (rowspan-safe)."""
-    class_tables = {}
-    teacher_blocks = defaultdict(lambda: defaultdict(list))
-    course_blocks = defaultdict(lambda: defaultdict(list))
-    room_blocks = defaultdict(lambda: defaultdict(list))
-
-    for filename in os.listdir(INPUT_DIR):
-        if not filename.endswith(".html"):
+@lru_cache(maxsize=None)
+def min_to_time(m):
+    """Convert minutes to HH:MM (memoised: only a few hundred distinct times occur)."""
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def format_time_range(session):
+    """Render a session's time range the way KFUEIT pages print it."""
+    return f"{min_to_time(session.start)} - {min_to_time(session.end)}"
+
+
+# Row boundaries of the standard grid: every slot start plus the end of the last slot
+GRID_BOUNDARIES = [time_to_min(t) for t in FIXED_TIMES] + [time_to_min(FIXED_TIMES[-1]) + SLOT_SIZE]
+
+
+def intern_session(session):
+    """Intern a session's strings so every view shares one copy of each name."""
+    return Session(
+        session.day,
+        session.start,
+        session.end,
+        sys.intern(session.course),
+        tuple(sys.intern(teacher) for teacher in session.teachers),
+        sys.intern(session.room),
+        sys.intern(session.class_name),
+    )
+
+
+def _load_bs4(markup, strainer=None):
+    """Load a class page with BeautifulSoup and return (heading_text, table_html, day_headers, rows)."""
+    soup = BeautifulSoup(markup, "html.parser", parse_only=strainer)
+
+    heading = soup.find("p", string=re.compile("Class:"))
+    table = soup.find("table", {"class": "time_table"})
+    if not table:
+        return heading.get_text() if heading else None, None, [], []
+
+    all_rows = table.find_all("tr")
+    day_headers = [th.get_text(strip=True) for th in all_rows[1].find_all("th")]
+    # html.parser does not close an unclosed <tr> at the next one, so later rows end up nested in it;
+    # only take the cells whose own row this is, as an HTML parser (and the lxml backend) would
+    rows = [
+        [
+            (
+                "lightgreen" in cell.get("class", []),
+                cell.get_text("\n", strip=True) if "lightgreen" in cell.get("class", []) else None,
+                int(cell.get("rowspan", 1)),
+            )
+            for cell in row.find_all("td") if cell.find_parent("tr") is row
+        ]
+        for row in all_rows[2:]
+    ]
+    return heading.get_text() if heading else None, str(table), day_headers, rows
+
+
+def _load_strainer(markup):
+    """BeautifulSoup backend that only builds <p> and <table> subtrees."""
+    return _load_bs4(markup, strainer=SoupStrainer(["p", "table"]))
+
+
+def _lxml_string(element):
+    """Mirror BeautifulSoup's .string: the sole text of an element, descending through single children."""
+    while True:
+        if len(element) == 0:
+            return element.text
+        if len(element) == 1 and not element.text and not element[0].tail:
+            element = element[0]
             continue
+        return None
 
-        filepath = os.path.join(INPUT_DIR, filename)
-        with open(filepath, "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f, "html.parser")
 
-        # extract class name
-        heading = soup.find("p", string=re.compile("Class:"))
-        class_name = heading.get_text().split("Class:")[-1].strip() if heading else filename
+def _lxml_text(element, separator="", strip=False):
+    """Mirror BeautifulSoup's get_text() for an lxml element (text nodes only, no comments)."""
+    texts = element.xpath(".//text()")
+    if strip:
+        texts = [text.strip() for text in texts if text.strip()]
+    return separator.join(texts)
 
-        # get timetable
-        table = soup.find("table", {"class": "time_table"})
-        if not table:
-            continue
 
-        class_tables[class_name] = str(table)
+def _load_lxml(markup):
+    """libxml2 backend: the whole document is parsed in C, only the heading and timetable are walked."""
+    # Bytes plus an explicit encoding: lxml rejects str input that starts with <?xml ... encoding=...?>
+    root = lxml.html.document_fromstring(markup.encode("utf-8"), parser=_LXML_PARSER)
 
-        header_row = table.find_all("tr")[1]
-        day_headers = [th.get_text(strip=True) for th in header_row.find_all("th")]
-        body_rows = table.find_all("tr")[2:]
-        rowspan_tracker = [0] * len(day_headers)
+    heading = None
+    for p in root.iter("p"):
+        string = _lxml_string(p)
+        if string is not None and "Class:" in string:
+            heading = _lxml_text(p)
+            break
 
-        for row in body_rows:
-            cells = row.find_all("td")
-            col_idx = 0
+    table = next((t for t in root.iter("table") if "time_table" in t.get("class", "").split()), None)
+    if table is None:
+        return heading, None, [], []
 
-            for cell in cells:
-                while col_idx < len(rowspan_tracker) and rowspan_tracker[col_idx] > 0:
-                    rowspan_tracker[col_idx] -= 1
-                    col_idx += 1
+    all_rows = list(table.iter("tr"))
+    day_headers = [_lxml_text(th, strip=True) for th in all_rows[1].iter("th")]
+    rows = []
+    for row in all_rows[2:]:
+        cells = []
+        for cell in row.iter("td"):
+            is_block = "lightgreen" in cell.get("class", "").split()
+            cells.append((is_block, _lxml_text(cell, "\n", strip=True) if is_block else None, int(cell.get("rowspan", 1))))
+        rows.append(cells)
+    return heading, lxml.html.tostring(table, encoding="unicode", with_tail=False), day_headers, rows
 
-                if "lightgreen" in cell.get("class", []):
-                    block_text = cell.get_text("\n", strip=True)
-                    lines = [line.strip() for line in block_text.split("\n") if line.strip()]
-                    if len(lines) < 4:
-                        col_idx += 1
-                        continue
 
-                    course_name = lines[0]
-                    course_match = re.match(r"^[A-Z]{3,5}-\d{3,4}-[A-Za-z0-9 ]+", course_name)
-                    if not course_match:
-                        col_idx += 1
-                        continue
+PARSER_BACKENDS = {"bs4": _load_bs4, "strainer": _load_strainer}
+if lxml is not None:
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+    PARSER_BACKENDS["lxml"] = _load_lxml
 
-                    i = 1
-                    teachers = []
-                    while i < len(lines) and any(prefix in lines[i] for prefix in ["Engr.", "Dr.", "Ms.", "Mr."]):
-                        teachers.append(lines[i])
-                        i += 1
 
-                    if not teachers:
-                        col_idx += 1
-                        continue
+def extract_slots(class_name, day_headers, rows, skipped=None):
+    """Walk timetable body rows (rowspan-safe) and return the class's Session records.
+
+    Each row is a list of (is_lightgreen, block_text, rowspan) cells, as produced by every parser backend.
+    If a skipped Counter is given, lightgreen cells that yield no session are counted by reason.
+    """
+    slots = []
+    rowspan_tracker = [0] * len(day_headers)
 
-                    room = lines[i] if i < len(lines) else "Unknown Room"
+    for cells in rows:
+        col_idx = 0
+
+        for is_block, block_text, rowspan in cells:
+            while col_idx < len(rowspan_tracker) and rowspan_tracker[col_idx] > 0:
+                rowspan_tracker[col_idx] -= 1
+                col_idx += 1
+
+            if is_block:
+                lines = [line.strip() for line in block_text.split("\n") if line.strip()]
+                if len(lines) < 4:
+                    if skipped is not None:
+                        skipped["too_few_lines"] += 1
+                    col_idx += 1
+                    continue
+
+                course_name = lines[0]
+                course_match = re.match(r"^[A-Z]{3,5}-\d{3,4}-[A-Za-z0-9 ]+", course_name)
+                if not course_match:
+                    if skipped is not None:
+                        skipped["no_course_match"] += 1
+                    col_idx += 1
+                    continue
+
+                i = 1
+                teachers = []
+                while i < len(lines) and any(prefix in lines[i] for prefix in ["Engr.", "Dr.", "Ms.", "Mr."]):
+                    teachers.append(lines[i])
                     i += 1
 
-                    time_range = lines[i] if i < len(lines) else "Unknown"
-                    if not re.match(r"\d{2}:\d{2}\s*-\s*\d{2}:\d{2}", time_range):
-                        col_idx += 1
+                if not teachers:
+                    if skipped is not None:
+                        skipped["no_teacher_prefix"] += 1
+                    col_idx += 1
+                    continue
+
+                room = lines[i] if i < len(lines) else "Unknown Room"
+                i += 1
+
+                time_range = lines[i] if i < len(lines) else "Unknown"
+                time_match = TIME_RANGE_RE.match(time_range)
+                if not time_match:
+                    if skipped is not None:
+                        skipped["bad_time_range"] += 1
+                    col_idx += 1
+                    continue
+
+                day = day_headers[col_idx] if col_idx < len(day_headers) else "Unknown"
+
+                sh, sm, eh, em = map(int, time_match.groups())
+                slots.append(Session(
+                    DAY_INDEX.get(day, -1), sh * 60 + sm, eh * 60 + em, course_name, tuple(teachers), room, class_name
+                ))
+
+            if rowspan > 1 and col_idx < len(rowspan_tracker):
+                rowspan_tracker[col_idx] = rowspan - 1
+
+            col_idx += 1
+
+    return slots
+
+
+def parse_class_html(markup, filename, backend=DEFAULT_BACKEND, stats=None):
+    """Parse one class page into (class_name, table_html, sessions), or None if it has no timetable.
+
+    Sessions are plain Session tuples so they can be shipped back from a worker process cheaply.
+    filename names the class when the page has no "Class:" heading.
+    If a stats dict is given, it receives the page's table cell, session and skipped-cell counts.
+    """
+    heading, table_html, day_headers, rows = PARSER_BACKENDS[backend](markup)
+
+    # extract class name
+    class_name = heading.split("Class:")[-1].strip() if heading else filename
+
+    skipped = Counter() if stats is not None else None
+    sessions = extract_slots(class_name, day_headers, rows, skipped) if table_html is not None else []
+    if stats is not None:
+        stats.update(cells=sum(len(cells) for cells in rows), sessions=len(sessions), skipped=dict(skipped))
+
+    if table_html is None:
+        return None
+
+    return class_name, table_html, sessions
+
+
+def parse_class_file(filepath, backend=DEFAULT_BACKEND, stats=None):
+    """Parse one class timetable file; see parse_class_html."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        markup = f.read()
+    return parse_class_html(markup, os.path.basename(filepath), backend, stats)
+
+
+def parse_class_file_stats(filepath, backend=DEFAULT_BACKEND):
+    """Return (parse_class_file result, stats) with the parse time added to the stats."""
+    stats = {}
+    started = time.perf_counter()
+    result = parse_class_file(filepath, backend, stats)
+    stats["parse_s"] = round(time.perf_counter() - started, 6)
+    return result, stats
+
+
+class ParseCache:
+    """On-disk cache of parse_class_file_stats results, keyed by path + size + mtime with a content hash fallback.
+
+    Entries written by a different parser backend count as misses.
+    """
+
+    def __init__(self, path=CACHE_FILE, rebuild=False, backend=DEFAULT_BACKEND):
+        self.conn = sqlite3.connect(path)
+        self.backend = backend
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            # Stored records from an older layout are useless; start over
+            self.conn.execute("DROP TABLE IF EXISTS files")
+            self.conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, backend TEXT, size INTEGER, mtime_ns INTEGER, sha256 TEXT, result TEXT, stats TEXT)"
+        )
+        if rebuild:
+            self.conn.execute("DELETE FROM files")
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+
+    def lookup(self, filepath):
+        """Return (True, result, stats) for an unchanged file, else (False, None, None)."""
+        st = os.stat(filepath)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha256, result, stats FROM files WHERE path = ? AND backend = ?",
+            (filepath, self.backend),
+        ).fetchone()
+
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            self.hits += 1
+            return True, self._decode(row[3]), json.loads(row[4])
+
+        with open(filepath, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+
+        if row and row[2] == digest:
+            # Touched but not modified: refresh the stat key and reuse the result
+            self.conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (st.st_size, st.st_mtime_ns, filepath)
+            )
+            self.hits += 1
+            return True, self._decode(row[3]), json.loads(row[4])
+
+        self._pending[filepath] = (st.st_size, st.st_mtime_ns, digest)
+        self.misses += 1
+        return False, None, None
+
+    def store(self, filepath, result, stats):
+        size, mtime_ns, digest = self._pending.pop(filepath)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, backend, size, mtime_ns, sha256, result, stats)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (filepath, self.backend, size, mtime_ns, digest, json.dumps(result), json.dumps(stats)),
+        )
+
+    def prune(self, filepaths):
+        """Drop entries for files that no longer exist in the input directory."""
+        keep = set(filepaths)
+        stale = [(path,) for (path,) in self.conn.execute("SELECT path FROM files") if path not in keep]
+        self.conn.executemany("DELETE FROM files WHERE path = ?", stale)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    @staticmethod
+    def _decode(data):
+        result = json.loads(data)
+        if result is None:
+            return None
+        class_name, table_html, sessions = result
+        return class_name, table_html, [
+            Session(day, start, end, course, tuple(teachers), room, session_class)
+            for day, start, end, course, teachers, room, session_class in sessions
+        ]
+
+
+def _cpu_seconds():
+    """CPU time of this process plus its finished children (e.g. parse workers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class BuildMetrics:
+    """Wall and CPU time per build phase, per-file parse stats and skipped-cell counts.
+
+    info holds run details (options, cache hits); write() emits everything as one JSON document
+    so runs can be charted against each other.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.files = []
+        self.info = {}
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            self.phases[name] = {
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(_cpu_seconds() - cpu, 4),
+            }
+
+    def add_file(self, filepath, stats):
+        self.files.append(dict(stats, file=filepath))
+
+    def skipped(self):
+        totals = Counter()
+        for stats in self.files:
+            totals.update(stats["skipped"])
+        return totals
+
+    def print_summary(self, slowest=3):
+        print("Phases: " + ", ".join(
+            f"{name} {phase['wall_s']:.2f}s ({phase['cpu_s']:.2f}s CPU)" for name, phase in self.phases.items()
+        ))
+        skipped = self.skipped()
+        if skipped:
+            print(f"Skipped {sum(skipped.values())} timetable cells: " + ", ".join(
+                f"{count} {reason.replace('_', ' ')}" for reason, count in skipped.most_common()
+            ))
+        parsed = sorted((stats for stats in self.files if not stats.get("cached")), key=lambda s: -s["parse_s"])
+        if parsed:
+            print("Slowest files: " + ", ".join(
+                f"{os.path.basename(stats['file'])} {stats['parse_s'] * 1000:.0f} ms ({stats['cells']} cells)"
+                for stats in parsed[:slowest]
+            ))
+
+    def write(self, path):
+        parsed = [stats for stats in self.files if not stats.get("cached")]
+        report = {
+            **self.info,
+            "phases": self.phases,
+            "totals": {
+                "files": len(self.files),
+                "parsed": len(parsed),
+                "parse_s": round(sum(stats["parse_s"] for stats in parsed), 4),
+                "cells": sum(stats["cells"] for stats in self.files),
+                "sessions": sum(stats["sessions"] for stats in self.files),
+                "skipped": dict(self.skipped()),
+            },
+            "files": sorted(self.files, key=lambda s: -s["parse_s"]),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+
+
+def peak_rss_mb(children=False):
+    """High-water resident set size of this process (or its largest finished child) in MB.
+
+    ru_maxrss is KiB on Linux, bytes on macOS.
+    """
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def run_profiled(profiler, func, *args):
+    """Run func(*args) under cProfile or pyinstrument, save the profile and print its top entries.
+
+    Only this process is profiled; with -j the parse workers are not.
+    """
+    if profiler == "pyinstrument":
+        if pyinstrument is None:
+            raise SystemExit("pyinstrument is not installed: pip install pyinstrument")
+        prof = pyinstrument.Profiler()
+        prof.start()
+        try:
+            return func(*args)
+        finally:
+            prof.stop()
+            html_path = os.path.splitext(PROFILE_FILE)[0] + ".profile.html"
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(prof.output_html())
+            print(prof.output_text())
+            print(f"Profile written to {html_path}.")
+
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(func, *args)
+    finally:
+        prof.dump_stats(PROFILE_FILE)
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(20)
+        print(f"Profile written to {PROFILE_FILE} (python -m pstats {PROFILE_FILE}).")
+
+
+def new_block_map():
+    """Return an empty entity -> day index -> [Session] map."""
+    return defaultdict(lambda: defaultdict(list))
+
+
+def add_sessions(sessions, teacher_blocks, course_blocks, room_blocks, columns=None):
+    """Index a class's sessions into the teacher, course and room block maps.
+
+    columns (e.g. an analytics.SessionColumns) is extended with the sessions too, if given.
+    """
+    for session in sessions:
+        session = intern_session(session)
+
+        for teacher in session.teachers:
+            teacher_blocks[teacher][session.day].append(session)
+
+        # Append once for course and room
+        course_blocks[session.course][session.day].append(session)
+        room_blocks[session.room][session.day].append(session)
+
+    if columns is not None:
+        columns.extend(sessions)
+
+
+def iter_parsed_files(workers=None, cache=None, backend=DEFAULT_BACKEND, metrics=None, batch_size=None):
+    """Yield (filepath, result) for every class page in INPUT_DIR, in directory order.
+
+    Each result is a parse_class_file result (None for pages without a timetable). Files are
+    looked up and parsed batch_size at a time (all at once by default), so a caller consuming the
+    results as they come holds only one batch. See extract_tables for the other arguments.
+    """
+    filepaths = [os.path.join(INPUT_DIR, filename) for filename in os.listdir(INPUT_DIR) if filename.endswith(".html")]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    parse = partial(parse_class_file_stats, backend=backend)
+    batch_size = batch_size or max(1, len(filepaths))
+
+    with ExitStack() as stack:
+        pool = None
+        for first in range(0, len(filepaths), batch_size):
+            batch = filepaths[first:first + batch_size]
+            results = [None] * len(batch)
+            file_stats = [None] * len(batch)
+            to_parse = []
+            for idx, filepath in enumerate(batch):
+                if cache is not None:
+                    found, result, stats = cache.lookup(filepath)
+                    if found:
+                        results[idx] = result
+                        file_stats[idx] = dict(stats, cached=True)
                         continue
+                to_parse.append(idx)
 
-                    day = day_headers[col_idx] if col_idx < len(day_headers) else "Unknown"
+            to_parse_paths = [batch[idx] for idx in to_parse]
+            if workers > 1 and len(to_parse_paths) > 1:
+                if pool is None:
+                    pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                parsed = list(pool.map(parse, to_parse_paths, chunksize=4))
+            else:
+                parsed = map(parse, to_parse_paths)
 
-                    # Reconstruct block_text to standardize
-                    reconstructed = f"{course_name}\n" + "\n".join(teachers) + f"\n{room}\n{time_range}"
-                    content = f"{reconstructed}\n[{class_name}]"
+            for idx, (result, stats) in zip(to_parse, parsed):
+                results[idx] = result
+                file_stats[idx] = stats
+                if cache is not None:
+                    cache.store(batch[idx], result, stats)
 
-                    for teacher in teachers:
-                        teacher_blocks[teacher][day].append((time_range, content))
+            if metrics is not None:
+                for filepath, stats in zip(batch, file_stats):
+                    metrics.add_file(filepath, stats)
 
-                    # Append once for course and room
-                    course_blocks[course_name][day].append((time_range, content))
-                    room_blocks[room][day].append((time_range, content))
+            yield from zip(batch, results)
 
-                rowspan = int(cell.get("rowspan", 1))
-                if rowspan > 1 and col_idx < len(rowspan_tracker):
-                    rowspan_tracker[col_idx] = rowspan - 1
+    if cache is not None:
+        cache.prune(filepaths)
 
-                col_idx += 1
+
+def parse_input_files(workers=None, cache=None, backend=DEFAULT_BACKEND, metrics=None):
+    """Parse every class page in INPUT_DIR; return (filepaths, results) in directory order.
+
+    See iter_parsed_files.
+    """
+    filepaths, results = [], []
+    for filepath, result in iter_parsed_files(workers, cache, backend, metrics):
+        filepaths.append(filepath)
+        results.append(result)
+    return filepaths, results
+
+
+def extract_tables(workers=None, cache=None, backend=DEFAULT_BACKEND, metrics=None, columns=None):
+    """Parse all class timetables and collect teacher, course, and room schedules (rowspan-safe).
+
+    The files are parsed in a process pool of workers processes (one per CPU by default; 1 parses
+    serially). Results are merged in directory order, so the output is identical to the serial path.
+    If a ParseCache is given, only new or changed files are parsed.
+    backend selects the page loader from PARSER_BACKENDS.
+    Per-file parse stats are added to metrics (a BuildMetrics) if given.
+    columns is passed on to add_sessions.
+    """
+    class_tables = {}
+    teacher_blocks = new_block_map()
+    course_blocks = new_block_map()
+    room_blocks = new_block_map()
+
+    _, results = parse_input_files(workers, cache, backend, metrics)
+    for result in results:
+        if result is None:
+            continue
+
+        class_name, table_html, sessions = result
+        class_tables[class_name] = table_html
+        add_sessions(sessions, teacher_blocks, course_blocks, room_blocks, columns)
 
     return class_tables, teacher_blocks, course_blocks, room_blocks
 
 
-def build_generic_tables(data_blocks, label):
-    """Build KFUEIT-style HTML tables for teachers, courses, or rooms using fixed time grid and rowspan."""
+def compare_backends(reference="bs4"):
+    """Check that every available parser backend yields the same teacher/course/room blocks as the reference."""
+    expected = extract_tables(backend=reference)[1:]
+    all_ok = True
+    for backend in PARSER_BACKENDS:
+        if backend == reference:
+            continue
+        actual = extract_tables(backend=backend)[1:]
+        ok = True
+        for label, want, got in zip(("teacher", "course", "room"), expected, actual):
+            if want != got:
+                ok = False
+                differing = sorted(key for key in set(want) | set(got) if want.get(key) != got.get(key))
+                print(f"[MISMATCH] {backend}: {len(differing)} {label} blocks differ from {reference}, e.g. {differing[:3]}")
+        if ok:
+            print(f"[OK] {backend} matches {reference}")
+        all_ok = all_ok and ok
+    return all_ok
+
+
+def find_conflicts(data_blocks, label):
+    """Find double bookings: overlapping lectures of one entity that are not the same (combined) lecture.
+
+    Classes sharing one lecture appear as sessions that differ only in class_name, so sessions are first
+    grouped into lectures. Each entity's day is then swept once in start order with a heap of
+    still-running lectures: O(n log n) plus the number of conflicts, rather than pairwise.
+    """
+    conflicts = []
+    for key, day_blocks in data_blocks.items():
+        if key == "Unknown Room":
+            continue
+        for day, blocks in day_blocks.items():
+            if day < 0:
+                continue
+            lectures = defaultdict(list)
+            for session in blocks:
+                lectures[session[:6]].append(session)
+
+            running = []
+            for seq, lecture in enumerate(sorted(lectures, key=lambda b: (b[1], b[2]))):
+                _, start, end = lecture[:3]
+                while running and running[0][0] <= start:
+                    heapq.heappop(running)
+                for other_end, _, other in running:
+                    conflicts.append({
+                        "type": label.lower(),
+                        "entity": key,
+                        "day": DAYS[day],
+                        "overlap": f"{min_to_time(start)} - {min_to_time(min(end, other_end))}",
+                        "sessions": [_lecture_summary(lectures[other]), _lecture_summary(lectures[lecture])],
+                        "_sessions": lectures[other] + lectures[lecture],
+                    })
+                heapq.heappush(running, (end, seq, lecture))
+    return conflicts
+
+
+def _lecture_summary(sessions):
+    session = sessions[0]
+    return {
+        "course": session.course,
+        "teachers": list(session.teachers),
+        "room": session.room,
+        "classes": [s.class_name for s in sessions],
+        "time": format_time_range(session),
+    }
+
+
+def report_conflicts(teacher_blocks, room_blocks, path=CONFLICTS_FILE):
+    """Write the teacher and room double-booking report to path; return the set of conflicting sessions."""
+    return write_conflicts(find_conflicts(teacher_blocks, "Teacher") + find_conflicts(room_blocks, "Room"), path)
+
+
+def write_conflicts(conflicts, path=CONFLICTS_FILE):
+    """Write find_conflicts results to path as the double-booking report; return the set of conflicting sessions."""
+    conflicting = {session for conflict in conflicts for session in conflict.pop("_sessions")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"count": len(conflicts), "conflicts": conflicts}, f, indent=1, ensure_ascii=False)
+    print(f"Found {len(conflicts)} teacher/room double bookings (see {path}).")
+    return conflicting
+
+
+_session_start = attrgetter("start")
+
+
+def grid_cells(day_blocks):
+    """Lay out one entity's sessions on a time grid derived from its own data.
+
+    Returns (boundaries, cells). boundaries is the sorted union of GRID_BOUNDARIES and every session
+    start and end; each row of the table runs from one boundary to the next. Sessions of a day are
+    swept once in start order and overlapping ones are clustered into one cell, so cells maps
+    (row, day) to (rowspan, sessions) with the rowspan counted in boundaries, not fixed-size slots.
+    """
+    boundaries = set(GRID_BOUNDARIES)
+    clusters = []  # [day, start, end, sessions]
+    for d, blocks in day_blocks.items():
+        if d < 0:
+            continue
+        cluster_end = -1
+        for session in sorted(blocks, key=_session_start) if len(blocks) > 1 else blocks:
+            start, end = session.start, session.end
+            boundaries.add(start)
+            boundaries.add(end)
+            if start < cluster_end:
+                if end > cluster_end:
+                    cluster_end = clusters[-1][2] = end
+                clusters[-1][3].append(session)
+            else:
+                cluster_end = end
+                clusters.append([d, start, end, [session]])
+
+    boundaries = sorted(boundaries)
+    row_of = {minute: row for row, minute in enumerate(boundaries)}
+    cells = {}
+    for d, start, end, sessions in clusters:
+        row = row_of[start]
+        cells[row, d] = (max(1, row_of[end] - row), sessions)
+    return boundaries, cells
+
+
+def render_fragment(sessions):
+    """Render the block for one course's sessions in a cell: a single session, or the merged ×N block."""
+    if len(sessions) == 1:
+        session = sessions[0]
+        formatted = "<br/>".join(
+            (session.course, *session.teachers, session.room, format_time_range(session),
+             f"[{session.class_name}]")
+        )
+        return f"<div class='neon-block'>{formatted}</div>"
+
+    combined = {}
+    for session in sessions:
+        key_tuple = (session.course, session.teachers, session.room, format_time_range(session))
+        combined.setdefault(key_tuple, []).append(f"[{session.class_name}]")
+
+    formatted_blocks = []
+    for (subject, teachers, room, time_text), classes in combined.items():
+        class_lines = "<br/>".join(classes)
+        name_display = "<br/>".join(teachers)
+        formatted_blocks.append(
+            f"{subject}<br/>{name_display}<br/>{room}<br/>{time_text}<br/>{class_lines}"
+        )
+
+    joined_blocks = "<hr style='margin:4px 0;border-top:1px dashed #00b7eb;'/>".join(formatted_blocks)
+    return f"""
+                        <div class='neon-block' style="position:relative;padding:3px;">
+                            {joined_blocks}
+                            <span class="badge badge-primary"
+                                  style="position:absolute;top:2px;right:2px;background:#26a69a;">×{len(sessions)}</span>
+                        </div>
+                        """
+
+
+class FragmentCache:
+    """Rendered cell fragments shared by the teacher, course and room views.
+
+    A session, or a group merged into one ×N block, renders to the same HTML in every view it
+    appears in, so each distinct fragment is formatted once. stats maps each view's label to
+    [hits, misses, render seconds].
+    """
+
+    def __init__(self):
+        self.fragments = {}
+        self.stats = {}
+
+    def report(self):
+        for label, (hits, misses, seconds) in self.stats.items():
+            lookups = hits + misses
+            print(f"{label} tables: {seconds * 1000:.0f} ms, fragment cache {hits}/{lookups} hits"
+                  f" ({hits / lookups if lookups else 0:.0%}).")
+
+
+def build_generic_tables(data_blocks, label, conflicts=None, fragments=None):
+    """Build KFUEIT-style HTML tables for teachers, courses, or rooms with a data-driven time grid and rowspan.
+
+    See grid_cells for the layout. Cells holding a session from conflicts (see report_conflicts) are
+    outlined in red. Pass one FragmentCache to every view to reuse fragments across them.
+    """
     tables = {}
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    fixed_times = ["09:00", "10:30", "12:00", "13:30", "15:00"]
-    slot_starts = [time_to_min(t) for t in fixed_times]
-    slot_size = 90  # minutes per slot
+    if fragments is None:
+        fragments = FragmentCache()
+    fragment_cache = fragments.fragments
+    hits = misses = 0
+    started = time.perf_counter()
 
     for key, day_blocks in data_blocks.items():
         header_row = "<tr class='time_table_heading'><th class='corner_box'><p>Day</p><span>Time</span></th>" + "".join(
-            f"<th>{day}</th>" for day in days
+            f"<th>{day}</th>" for day in DAYS
         ) + "</tr>"
 
-        # Process blocks per day: parse times and sort
-        processed_day_blocks = {}
-        for day in days:
-            blocks = day_blocks.get(day, [])
-            parsed_blocks = []
-            for time_range, content in blocks:
-                if not re.match(r"\d{2}:\d{2}\s*-\s*\d{2}:\d{2}", time_range):
-                    continue
-                start_str, end_str = re.split(r"\s*-\s*", time_range)
-                start_min = time_to_min(start_str)
-                end_min = time_to_min(end_str)
-                parsed_blocks.append({'start_min': start_min, 'end_min': end_min, 'start_str': start_str, 'content': content})
-            parsed_blocks.sort(key=lambda x: x['start_min'])
-            processed_day_blocks[day] = parsed_blocks
+        boundaries, cells = grid_cells(day_blocks)
 
         # Build rows with rowspan tracking
-        rowspan_tracker = [0] * len(days)
+        rowspan_tracker = [0] * len(DAYS)
         rows_html = ""
-        for slot_idx, start_time in enumerate(fixed_times):
-            current_start_min = slot_starts[slot_idx]
+        for row in range(len(boundaries) - 1):
+            start_time = min_to_time(boundaries[row])
             row_cells = [f"<td class='timeside'><p>{start_time}</p></td>"]
-            for d, day in enumerate(days):
+            for d, day in enumerate(DAYS):
                 if rowspan_tracker[d] > 0:
                     rowspan_tracker[d] -= 1
                     continue  # Skip cell, covered by previous rowspan
 
-                blocks_this_day = processed_day_blocks[day]
-                starting_blocks = [b for b in blocks_this_day if b['start_min'] == current_start_min]
+                cell = cells.get((row, d))
 
                 # Handle Friday prayer break if no block and it's the 13:30 slot on Friday
-                if not starting_blocks and day == "Friday" and start_time == "13:30":
+                if not cell and day == "Friday" and start_time == "13:30":
                     row_cells.append("<td rowspan=1 class='breaktime'><br>Friday Prayer<br/>13:30 - 14:00</td>")
                     continue
 
-                if not starting_blocks:
+                if not cell:
                     row_cells.append("<td class='fixedheight'> --- </td>")
                     continue
 
-                # Assume all starting blocks have same duration
-                duration = starting_blocks[0]['end_min'] - current_start_min
-                rowspan = duration // slot_size
+                rowspan, clustered = cell
 
-                # Collect contents and merge as before
-                contents = [b['content'] for b in starting_blocks]
+                # Merge sessions of the same course
                 merged = defaultdict(list)
-                for content in contents:
-                    title = content.split("\n")[0]
-                    merged[title].append(content)
+                for session in clustered:
+                    merged[session.course].append(session)
 
                 cell_html = ""
-                for title, all_contents in merged.items():
-                    if len(all_contents) == 1:
-                        formatted = all_contents[0].replace("\n", "<br/>")
-                        cell_html += f"<div class='neon-block'>{formatted}</div>"
+                for sessions in merged.values():
+                    fragment_key = tuple(sessions)
+                    fragment = fragment_cache.get(fragment_key)
+                    if fragment is None:
+                        misses += 1
+                        fragment = fragment_cache[fragment_key] = render_fragment(sessions)
                     else:
-                        combined = {}
-                        for content in all_contents:
-                            parts = content.strip().split("\n")
-                            if len(parts) < 5:
-                                continue
-                            class_part = parts[-1]
-                            time_text = parts[-2]
-                            room = parts[-3]
-                            subject = parts[0]
-                            name_lines = parts[1:-3]
-                            name_line = ", ".join(name_lines)
-                            key_tuple = (subject, name_line, room, time_text)
-                            combined.setdefault(key_tuple, []).append(class_part)
-
-                        formatted_blocks = []
-                        for (subject, name_line, room, time_text), classes in combined.items():
-                            class_lines = "<br/>".join(classes)
-                            name_display = name_line.replace(", ", "<br/>")
-                            formatted_blocks.append(
-                                f"{subject}<br/>{name_display}<br/>{room}<br/>{time_text}<br/>{class_lines}"
-                            )
-
-                        joined_blocks = "<hr style='margin:4px 0;border-top:1px dashed #00b7eb;'/>".join(formatted_blocks)
-                        formatted_block = f"""
-                        <div class='neon-block' style="position:relative;padding:3px;">
-                            {joined_blocks}
-                            <span class="badge badge-primary"
-                                  style="position:absolute;top:2px;right:2px;background:#26a69a;">×{len(all_contents)}</span>
-                        </div>
-                        """
-                        cell_html += formatted_block
+                        hits += 1
+                    cell_html += fragment
 
                 # Add the td with rowspan and lightgreen class
-                row_cells.append(f"<td rowspan={rowspan} class='lightgreen'>{cell_html}</td>")
+                if conflicts and any(session in conflicts for session in clustered):
+                    row_cells.append(
+                        f"<td rowspan={rowspan} class='lightgreen conflict' "
+                        f"style='outline:2px solid {CONFLICT_COLOR};outline-offset:-2px;'>{cell_html}</td>"
+                    )
+                else:
+                    row_cells.append(f"<td rowspan={rowspan} class='lightgreen'>{cell_html}</td>")
 
                 if rowspan > 1:
                     rowspan_tracker[d] = rowspan - 1
@@ -227,15 +877,77 @@ def build_generic_tables(data_blocks, label):
         """
         tables[key] = table_html
 
+    stats = fragments.stats.setdefault(label, [0, 0, 0.0])
+    stats[0] += hits
+    stats[1] += misses
+    stats[2] += time.perf_counter() - started
     return tables
 
 
-def build_html(class_tables, teacher_tables, course_tables, room_tables):
-    class_options = "".join([f"<option value='{c}'>{c}</option>" for c in sorted(class_tables)])
-    teacher_options = "".join([f"<option value='{t}'>{t}</option>" for t in sorted(teacher_tables)])
-    course_options = "".join([f"<option value='{c}'>{c}</option>" for c in sorted(course_tables)])
-    room_options = "".join([f"<option value='{r}'>{r}</option>" for r in sorted(room_tables)])
+def build_session_payload(class_names, teacher_blocks, course_blocks, room_blocks, conflicts=None):
+    """Normalise all sessions into one deduplicated dataset for the client-side renderer.
+
+    Every distinct session is listed once as [day, start, end, course, [teachers], room, class]
+    with names replaced by indexes into "strings"; each view maps an entity to its session ids.
+    Sessions from conflicts are listed by id under "conflicts" for highlighting.
+    """
+    strings, string_ids = [], {}
+    sessions, session_ids = [], {}
+
+    def string_id(text):
+        idx = string_ids.get(text)
+        if idx is None:
+            idx = string_ids[text] = len(strings)
+            strings.append(text)
+        return idx
+
+    def session_id(session):
+        idx = session_ids.get(session)
+        if idx is None:
+            idx = session_ids[session] = len(sessions)
+            sessions.append([
+                session.day, session.start, session.end, string_id(session.course),
+                [string_id(teacher) for teacher in session.teachers], string_id(session.room),
+                string_id(session.class_name),
+            ])
+        return idx
+
+    def view(data_blocks):
+        return {
+            key: [session_id(session) for blocks in day_blocks.values() for session in blocks]
+            for key, day_blocks in data_blocks.items()
+        }
+
+    # Every session is in exactly one course's blocks, which gives the per-class view for free
+    class_view = {name: [] for name in class_names}
+    for day_blocks in course_blocks.values():
+        for blocks in day_blocks.values():
+            for session in blocks:
+                class_view.setdefault(session.class_name, []).append(session_id(session))
+
+    payload = {
+        "days": DAYS,
+        "gridBoundaries": GRID_BOUNDARIES,
+        "strings": strings,
+        "sessions": sessions,
+        "views": {
+            "class": class_view,
+            "teacher": view(teacher_blocks),
+            "course": view(course_blocks),
+            "room": view(room_blocks),
+        },
+    }
+    if conflicts:
+        payload["conflicts"] = sorted(session_ids[session] for session in conflicts if session in session_ids)
+        payload["conflictColor"] = CONFLICT_COLOR
+    return payload
+
+
+def iter_page_head(class_names, teacher_names, course_names, room_names, extra_html=""):
+    """Yield the page up to the timetable area in chunks: styles, scripts and the four selectpickers.
 
+    extra_html (e.g. the free slot finder) is placed right below the timetable area.
+    """
     futuristic_css = """
     body {
         background-color: #0a0a0a;
@@ -371,7 +1083,7 @@ def build_html(class_tables, teacher_tables, course_tables, room_tables):
     }
     """
 
-    html = f"""
+    yield f"""
     <!DOCTYPE html>
     <html>
     <head>
@@ -394,74 +1106,294 @@ def build_html(class_tables, teacher_tables, course_tables, room_tables):
                 <label>Select Class</label>
                 <select id="classSelect" class="form-control selectpicker" data-live-search="true">
                     <option value="">-- Choose Class --</option>
-                    {class_options}
+                    """
+    for c in sorted(class_names):
+        yield f"<option value='{c}'>{c}</option>"
+    yield """
                 </select>
             </div>
             <div class="col-md-3">
                 <label>Select Teacher</label>
                 <select id="teacherSelect" class="form-control selectpicker" data-live-search="true">
                     <option value="">-- Choose Teacher --</option>
-                    {teacher_options}
+                    """
+    for t in sorted(teacher_names):
+        yield f"<option value='{t}'>{t}</option>"
+    yield """
                 </select>
             </div>
             <div class="col-md-3">
                 <label>Select Course</label>
                 <select id="courseSelect" class="form-control selectpicker" data-live-search="true">
                     <option value="">-- Choose Course --</option>
-                    {course_options}
+                    """
+    for c in sorted(course_names):
+        yield f"<option value='{c}'>{c}</option>"
+    yield """
                 </select>
             </div>
             <div class="col-md-3">
                 <label>Select Room</label>
                 <select id="roomSelect" class="form-control selectpicker" data-live-search="true">
                     <option value="">-- Choose Room --</option>
-                    {room_options}
+                    """
+    for r in sorted(room_names):
+        yield f"<option value='{r}'>{r}</option>"
+    yield """
                 </select>
             </div>
         </div>
         <hr style="border-color: #00b7eb; width: 100%; max-width: 1200px;">
         <div id="timetableArea"></div>
+"""
+    if extra_html:
+        yield extra_html
+
+
+def build_page_head(class_names, teacher_names, course_names, room_names, extra_html=""):
+    """Render the page up to the timetable area: styles, scripts and the four selectpickers."""
+    return "".join(iter_page_head(class_names, teacher_names, course_names, room_names, extra_html))
 
+
+def iter_json_object(tables):
+    """Yield a name -> table map as JSON text in chunks, exactly as json.dumps writes a dict.
+
+    tables is a dict or an iterable of (name, table) pairs, so tables can be rendered as they are written.
+    """
+    items = tables.items() if isinstance(tables, dict) else tables
+    yield "{"
+    separator = ""
+    for name, table in items:
+        yield f"{separator}{json.dumps(name)}: {json.dumps(table)}"
+        separator = ", "
+    yield "}"
+
+
+def iter_html(class_tables, teacher_tables, course_tables, room_tables, extra_html="", names=None):
+    """Yield the complete page in chunks, serialising each table map incrementally.
+
+    The table maps may also be iterables of (name, table) pairs (see iter_json_object); names then
+    gives the class, teacher, course and room names for the selectpickers.
+    """
+    yield from iter_page_head(*(names or (class_tables, teacher_tables, course_tables, room_tables)), extra_html)
+    yield """
         <script>
-            $(document).ready(function() {{
+            $(document).ready(function() {
                 $('.selectpicker').selectpicker();
 
-                function showTable(val, tables) {{
+                function showTable(val, tables) {
                     const area = $('#timetableArea');
                     area.removeClass('visible animate__animated animate__fadeIn');
                     area.html(tables[val] || "");
-                    setTimeout(() => {{
+                    setTimeout(() => {
                         area.addClass('animate__animated animate__fadeIn');
                         area.addClass('visible');
-                    }}, 100);
+                    }, 100);
 
                     // Reset other selectpickers to ensure they remain functional
-                    $('.selectpicker').not(this).each(function() {{
+                    $('.selectpicker').not(this).each(function() {
                         $(this).val('').selectpicker('refresh');
-                    }});
-                }}
+                    });
+                }
 
-                $('#classSelect').on('changed.bs.select', function() {{
+                $('#classSelect').on('changed.bs.select', function() {
                     showTable($(this).val(), classTables);
-                }});
+                });
 
-                $('#teacherSelect').on('changed.bs.select', function() {{
+                $('#teacherSelect').on('changed.bs.select', function() {
                     showTable($(this).val(), teacherTables);
-                }});
+                });
 
-                $('#courseSelect').on('changed.bs.select', function() {{
+                $('#courseSelect').on('changed.bs.select', function() {
                     showTable($(this).val(), courseTables);
-                }});
+                });
 
-                $('#roomSelect').on('changed.bs.select', function() {{
+                $('#roomSelect').on('changed.bs.select', function() {
                     showTable($(this).val(), room_tables);
-                }});
-            }});
+                });
+            });
+
+            const classTables = """
+    yield from iter_json_object(class_tables)
+    yield """;
+            const teacherTables = """
+    yield from iter_json_object(teacher_tables)
+    yield """;
+            const courseTables = """
+    yield from iter_json_object(course_tables)
+    yield """;
+            const room_tables = """
+    yield from iter_json_object(room_tables)
+    yield """;
+        </script>
+    </body>
+    </html>
+    """
+
+
+def build_html(class_tables, teacher_tables, course_tables, room_tables, extra_html=""):
+    """Render the complete page with every class, teacher, course and room table embedded."""
+    return "".join(iter_html(class_tables, teacher_tables, course_tables, room_tables, extra_html))
+
+
+def write_html(f, class_tables, teacher_tables, course_tables, room_tables, extra_html="", names=None):
+    """Stream the page produced by build_html (or iter_html with names) to an open text file without holding it in memory."""
+    for chunk in iter_html(class_tables, teacher_tables, course_tables, room_tables, extra_html, names):
+        f.write(chunk)
+
+
+# Client-side counterpart of build_generic_tables for pages built with build_data_html
+DATA_RENDERER_JS = """
+            function fmtTime(m) {
+                return String(Math.floor(m / 60)).padStart(2, '0') + ':' + String(m % 60).padStart(2, '0');
+            }
+
+            function describeSession(s, classIds) {
+                const str = timetableData.strings;
+                return [str[s[3]], ...s[4].map(t => str[t]), str[s[5]], fmtTime(s[1]) + ' - ' + fmtTime(s[2]),
+                        ...classIds.map(c => '[' + str[c] + ']')].join('<br/>');
+            }
+
+            // Same layout as grid_cells: rows between the union of standard and session boundaries,
+            // overlapping sessions of a day clustered into one cell
+            function gridCells(sessions) {
+                const boundaries = new Set(timetableData.gridBoundaries);
+                const clusters = [];
+                timetableData.days.forEach((day, d) => {
+                    let cluster = null;
+                    sessions.filter(s => s[0] === d).sort((a, b) => a[1] - b[1]).forEach(s => {
+                        boundaries.add(s[1]);
+                        boundaries.add(s[2]);
+                        if (cluster && s[1] < cluster.end) {
+                            cluster.end = Math.max(cluster.end, s[2]);
+                            cluster.sessions.push(s);
+                        } else {
+                            cluster = {day: d, start: s[1], end: s[2], sessions: [s]};
+                            clusters.push(cluster);
+                        }
+                    });
+                });
+
+                const sorted = [...boundaries].sort((a, b) => a - b);
+                const rowOf = new Map(sorted.map((minute, row) => [minute, row]));
+                const cells = new Map();
+                for (const c of clusters) {
+                    const row = rowOf.get(c.start);
+                    cells.set(row + ':' + c.day, {rowspan: Math.max(1, rowOf.get(c.end) - row), sessions: c.sessions});
+                }
+                return {boundaries: sorted, cells};
+            }
+
+            function renderTable(label, key, ids) {
+                if (!ids) return '';
+                const {boundaries, cells: grid} = gridCells(ids.map(id => timetableData.sessions[id]));
+
+                const conflicting = new Set((timetableData.conflicts || []).map(id => timetableData.sessions[id]));
+                const tracker = timetableData.days.map(() => 0);
+                let rows = '';
+                for (let row = 0; row < boundaries.length - 1; row++) {
+                    const start = boundaries[row];
+                    let cells = `<td class='timeside'><p>${fmtTime(start)}</p></td>`;
+                    timetableData.days.forEach((day, d) => {
+                        if (tracker[d] > 0) {
+                            tracker[d]--;
+                            return;
+                        }
+                        const cell = grid.get(row + ':' + d);
+                        if (!cell) {
+                            cells += day === 'Friday' && start === 810
+                                ? "<td rowspan=1 class='breaktime'><br>Friday Prayer<br/>13:30 - 14:00</td>"
+                                : "<td class='fixedheight'> --- </td>";
+                            return;
+                        }
+
+                        const {rowspan, sessions: blocks} = cell;
+                        const merged = new Map();
+                        for (const s of blocks) {
+                            if (!merged.has(s[3])) merged.set(s[3], []);
+                            merged.get(s[3]).push(s);
+                        }
+
+                        let cellHtml = '';
+                        merged.forEach(group => {
+                            if (group.length === 1) {
+                                cellHtml += `<div class='neon-block'>${describeSession(group[0], [group[0][6]])}</div>`;
+                                return;
+                            }
+                            const combined = new Map();
+                            for (const s of group) {
+                                const k = [s[3], s[4].join(','), s[5], s[1], s[2]].join('|');
+                                if (!combined.has(k)) combined.set(k, {session: s, classes: []});
+                                combined.get(k).classes.push(s[6]);
+                            }
+                            const parts = [...combined.values()].map(c => describeSession(c.session, c.classes));
+                            cellHtml += `<div class='neon-block' style="position:relative;padding:3px;">`
+                                + parts.join("<hr style='margin:4px 0;border-top:1px dashed #00b7eb;'/>")
+                                + `<span class="badge badge-primary" style="position:absolute;top:2px;right:2px;background:#26a69a;">×${group.length}</span></div>`;
+                        });
+                        cells += blocks.some(s => conflicting.has(s))
+                            ? `<td rowspan=${rowspan} class='lightgreen conflict' `
+                              + `style='outline:2px solid ${timetableData.conflictColor};outline-offset:-2px;'>${cellHtml}</td>`
+                            : `<td rowspan=${rowspan} class='lightgreen'>${cellHtml}</td>`;
+                        if (rowspan > 1) tracker[d] = rowspan - 1;
+                    });
+                    rows += `<tr>${cells}</tr>`;
+                }
+
+                const header = "<tr class='time_table_heading'><th class='corner_box'><p>Day</p><span>Time</span></th>"
+                    + timetableData.days.map(day => `<th>${day}</th>`).join('') + '</tr>';
+                return `<table class="table table-bordered time_table" width="100%">`
+                    + `<tr><td colspan="8"><h3 align="center" class="kf_heading">KFUEIT Time Table</h3>`
+                    + `<div class="kf_p"><p align="center">${label}: ${key}</p></div></td></tr>`
+                    + header + rows + '</table>';
+            }
+
+            $(document).ready(function() {
+                $('.selectpicker').selectpicker();
 
-            const classTables = {json.dumps(class_tables)};
-            const teacherTables = {json.dumps(teacher_tables)};
-            const courseTables = {json.dumps(course_tables)};
-            const room_tables = {json.dumps(room_tables)};
+                function showTable(html) {
+                    const area = $('#timetableArea');
+                    area.removeClass('visible animate__animated animate__fadeIn');
+                    area.html(html);
+                    setTimeout(() => {
+                        area.addClass('animate__animated animate__fadeIn');
+                        area.addClass('visible');
+                    }, 100);
+
+                    // Reset other selectpickers to ensure they remain functional
+                    $('.selectpicker').not(this).each(function() {
+                        $(this).val('').selectpicker('refresh');
+                    });
+                }
+
+                const views = timetableData.views;
+                $('#classSelect').on('changed.bs.select', function() {
+                    showTable(renderTable('Class', $(this).val(), views.class[$(this).val()]));
+                });
+
+                $('#teacherSelect').on('changed.bs.select', function() {
+                    showTable(renderTable('Teacher', $(this).val(), views.teacher[$(this).val()]));
+                });
+
+                $('#courseSelect').on('changed.bs.select', function() {
+                    showTable(renderTable('Course', $(this).val(), views.course[$(this).val()]));
+                });
+
+                $('#roomSelect').on('changed.bs.select', function() {
+                    showTable(renderTable('Room', $(this).val(), views.room[$(this).val()]));
+                });
+            });
+"""
+
+
+def build_data_html(payload, extra_html=""):
+    """Render a page that ships only the session dataset and builds each grid in the browser."""
+    views = payload["views"]
+    data_json = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
+    html = build_page_head(views["class"], views["teacher"], views["course"], views["room"], extra_html) + f"""
+        <script>
+            const timetableData = {data_json};
+{DATA_RENDERER_JS}
         </script>
     </body>
     </html>
@@ -469,24 +1401,684 @@ def build_html(class_tables, teacher_tables, course_tables, room_tables):
     return html
 
 
-def main():
-    print("Extracting tables...")
-    class_tables, teacher_blocks, course_blocks, room_blocks = extract_tables()
-    print(f"Found {len(class_tables)} classes, {len(teacher_blocks)} teachers, {len(course_blocks)} courses, and {len(room_blocks)} rooms.")
+def build_sharded_index(shard_index, extra_html=""):
+    """Render the sharded index page: option lists only, each table is fetched when selected."""
+    html = build_page_head(
+        shard_index["class"], shard_index["teacher"], shard_index["course"], shard_index["room"], extra_html
+    ) + f"""
+        <script>
+            const shardIndex = {json.dumps(shard_index)};
+            const fetchedShards = new Map();
+
+            function loadShard(view, val) {{
+                const path = shardIndex[view][val];
+                if (!path) return Promise.resolve("");
+                if (!fetchedShards.has(path)) {{
+                    fetchedShards.set(path, fetch(path).then(resp => resp.json()));
+                }}
+                return fetchedShards.get(path);
+            }}
 
-    print("Building timetables...")
-    teacher_tables = build_generic_tables(teacher_blocks, "Teacher")
-    course_tables = build_generic_tables(course_blocks, "Course")
-    room_tables = build_generic_tables(room_blocks, "Room")
+            $(document).ready(function() {{
+                $('.selectpicker').selectpicker();
 
-    print("Generating HTML...")
-    final_html = build_html(class_tables, teacher_tables, course_tables, room_tables)
+                function showTable(html) {{
+                    const area = $('#timetableArea');
+                    area.removeClass('visible animate__animated animate__fadeIn');
+                    area.html(html);
+                    setTimeout(() => {{
+                        area.addClass('animate__animated animate__fadeIn');
+                        area.addClass('visible');
+                    }}, 100);
+
+                    // Reset other selectpickers to ensure they remain functional
+                    $('.selectpicker').not(this).each(function() {{
+                        $(this).val('').selectpicker('refresh');
+                    }});
+                }}
+
+                for (const [view, select] of [['class', '#classSelect'], ['teacher', '#teacherSelect'],
+                                              ['course', '#courseSelect'], ['room', '#roomSelect']]) {{
+                    $(select).on('changed.bs.select', function() {{
+                        loadShard(view, $(this).val()).then(showTable);
+                    }});
+                }}
+            }});
+        </script>
+    </body>
+    </html>
+    """
+    return html
+
+
+def write_precompressed(path, data):
+    """Write data plus .gz (and .br, when brotli is installed) siblings for a static server to serve as-is.
+
+    Files already holding data are left alone, so unchanged shards are not compressed again.
+    Returns whether anything was written.
+    """
+    siblings = [path + ".gz"] + ([path + ".br"] if brotli is not None else [])
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data and all(os.path.exists(sibling) for sibling in siblings):
+                return False
+    except FileNotFoundError:
+        pass
+
+    with open(path, "wb") as f:
+        f.write(data)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=BROTLI_QUALITY))
+    elif os.path.exists(path + ".br"):
+        os.remove(path + ".br")  # left by an earlier run with brotli; it would no longer match
+    return True
+
+
+def shard_path(view, name):
+    """The shard of an entity, named by a hash of its name (names hold spaces, dots and slashes).
+
+    Unlike a position in the sorted names, the hash does not change when other entities come or go.
+    """
+    return f"shards/{view}/{hashlib.blake2b(name.encode('utf-8'), digest_size=8).hexdigest()}.json"
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+
+def write_sharded_output(out_dir, class_tables, teacher_tables, course_tables, room_tables, extra_html="",
+                         changed=None):
+    """Write index.html plus one JSON fragment per class, teacher, course and room under out_dir.
+
+    With changed (view -> names), only those shards and the index are rewritten, and the shards of
+    changed names no longer in the tables are removed; out_dir must hold the previous write.
+    A table map may also be an iterable of (name, table) pairs already in name order.
+    """
+    shard_root = os.path.join(out_dir, "shards")
+    shard_index = {}
+    for view, tables in (("class", class_tables), ("teacher", teacher_tables),
+                         ("course", course_tables), ("room", room_tables)):
+        view_dir = os.path.join(shard_root, view)
+        os.makedirs(view_dir, exist_ok=True)
+        shard_index[view] = {}
+        for name, table in sorted(tables.items()) if isinstance(tables, dict) else tables:
+            relpath = shard_path(view, name)
+            if changed is None or name in changed[view]:
+                write_precompressed(os.path.join(out_dir, relpath), json.dumps(table).encode("utf-8"))
+            shard_index[view][name] = relpath
+
+        if changed is not None:
+            for name in changed[view]:
+                if name not in shard_index[view]:
+                    shard = os.path.join(out_dir, shard_path(view, name))
+                    for path in (shard, shard + ".gz", shard + ".br"):
+                        if os.path.exists(path):
+                            os.remove(path)
+        else:
+            # Drop the shards (and siblings) of entities an earlier write had but this one has not
+            kept = {os.path.basename(relpath) for relpath in shard_index[view].values()}
+            for filename in os.listdir(view_dir):
+                if filename.split(".")[0] + ".json" not in kept:
+                    os.remove(os.path.join(view_dir, filename))
+
+    index_path = os.path.join(out_dir, "index.html")
+    write_precompressed(index_path, build_sharded_index(shard_index, extra_html).encode("utf-8"))
+    return index_path
+
+
+def write_output(class_tables, teacher_blocks, course_blocks, room_blocks, data_only=False, sharded=False,
+                 conflicts=None, free_slots=False, metrics=None):
+    """Render the extracted blocks and write OUTPUT_FILE (or the SHARD_DIR tree when sharded).
+
+    Sessions in conflicts are highlighted in the rendered tables; free_slots embeds the occupancy
+    index and the free room / common free time finder. The render and write phases are timed
+    into metrics (a BuildMetrics) if given.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+
+    with metrics.phase("render"):
+        extra_html = ""
+        if free_slots:
+            extra_html = build_free_slot_finder(OccupancyIndex.from_blocks(teacher_blocks, room_blocks, DAYS))
+
+        if data_only:
+            print("Generating HTML...")
+            final_html = build_data_html(
+                build_session_payload(class_tables, teacher_blocks, course_blocks, room_blocks, conflicts), extra_html
+            )
+        else:
+            print("Building timetables...")
+            fragments = FragmentCache()
+            teacher_tables = build_generic_tables(teacher_blocks, "Teacher", conflicts, fragments)
+            course_tables = build_generic_tables(course_blocks, "Course", conflicts, fragments)
+            room_tables = build_generic_tables(room_blocks, "Room", conflicts, fragments)
+            fragments.report()
+
+    if not data_only:
+        write_tables(class_tables, teacher_tables, course_tables, room_tables, extra_html, sharded, metrics)
+        return
+
+    with metrics.phase("write"), open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         f.write(final_html)
+    print(f"✅ Done! Open {OUTPUT_FILE} in your browser.")
+
+
+def write_tables(class_tables, teacher_tables, course_tables, room_tables, extra_html="", sharded=False,
+                 metrics=None, changed=None):
+    """Write rendered tables to OUTPUT_FILE (or the SHARD_DIR tree when sharded), timed into metrics.
 
+    changed is passed on to write_sharded_output.
+    """
+    if metrics is None:
+        metrics = BuildMetrics()
+
+    if sharded:
+        print("Writing shards...")
+        with metrics.phase("write"):
+            index_path = write_sharded_output(
+                SHARD_DIR, class_tables, teacher_tables, course_tables, room_tables, extra_html, changed
+            )
+        if brotli is None:
+            print("brotli is not installed; only .gz siblings were written.")
+        print(f"✅ Done! Serve {SHARD_DIR}/ over HTTP and open {index_path}.")
+        return
+
+    print("Generating HTML...")
+    with metrics.phase("write"), open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        write_html(f, class_tables, teacher_tables, course_tables, room_tables, extra_html)
     print(f"✅ Done! Open {OUTPUT_FILE} in your browser.")
 
 
+def build(args, metrics):
+    """Extract, check and render everything as configured by main's arguments, timing each phase."""
+    cache = None if args.no_cache else ParseCache(CACHE_FILE, rebuild=args.rebuild_cache, backend=args.parser)
+
+    print("Extracting tables...")
+    with metrics.phase("extract"):
+        try:
+            class_tables, teacher_blocks, course_blocks, room_blocks = extract_tables(
+                workers=args.jobs, cache=cache, backend=args.parser, metrics=metrics
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+    print(f"Found {len(class_tables)} classes, {len(teacher_blocks)} teachers, {len(course_blocks)} courses, and {len(room_blocks)} rooms.")
+
+    with metrics.phase("conflicts"):
+        conflicts = report_conflicts(teacher_blocks, room_blocks)
+
+    if args.export_db:
+        with metrics.phase("export"):
+            export_database(args.export_db, class_tables, course_blocks)
+
+    write_output(class_tables, teacher_blocks, course_blocks, room_blocks,
+                 data_only=args.data_only, sharded=args.sharded,
+                 conflicts=conflicts if args.highlight_conflicts else None, free_slots=args.free_slots,
+                 metrics=metrics)
+
+    metrics.info["entities"] = {
+        "classes": len(class_tables), "teachers": len(teacher_blocks),
+        "courses": len(course_blocks), "rooms": len(room_blocks),
+    }
+    if cache is not None:
+        metrics.info["cache"] = {"hits": cache.hits, "misses": cache.misses}
+        print(f"Parse cache: {cache.hits} hits, {cache.misses} misses.")
+
+
+class SpillRuns:
+    """Records of one kind spilled to disk as sorted runs of JSON lines, for an external sort.
+
+    Records are lists ordered by their first key_length fields, which must be unique per record.
+    add() buffers only that key and the encoded line; every SPILL_RUN_BYTES of JSON the buffer is
+    sorted and written out as one run.
+    """
+
+    def __init__(self, directory, name, key_length):
+        self.directory = directory
+        self.name = name
+        self.key_length = key_length
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.runs = []
+        self.records = 0
+
+    def add(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self.buffer.append((tuple(record[:self.key_length]), line))
+        self.buffered_bytes += len(line)
+        self.records += 1
+        if self.buffered_bytes >= SPILL_RUN_BYTES:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.buffer.sort(key=itemgetter(0))
+        path = os.path.join(self.directory, f"{self.name}.{len(self.runs)}.run")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(line for _, line in self.buffer)
+        self.runs.append(path)
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    @staticmethod
+    def merge(paths):
+        """Yield the records of sorted run files in overall sort order."""
+        with ExitStack() as stack:
+            files = [stack.enter_context(open(path, "r", encoding="utf-8")) for path in paths]
+            yield from heapq.merge(*(map(json.loads, f) for f in files))
+
+    def sorted_records(self):
+        """Yield every record in sort order, merging at most SPILL_MERGE_FANIN runs at a time."""
+        self.flush()
+        while len(self.runs) > SPILL_MERGE_FANIN:
+            merged = []
+            for first in range(0, len(self.runs), SPILL_MERGE_FANIN):
+                group = self.runs[first:first + SPILL_MERGE_FANIN]
+                path = os.path.join(self.directory, f"{self.name}.{len(self.runs)}-{first}.run")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.merge(group))
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            self.runs = merged
+        yield from self.merge(self.runs)
+
+
+def iter_entity_blocks(runs):
+    """Yield (entity, day -> [Session]) one entity at a time from sorted session records (see spill_sessions)."""
+    for name, records in groupby(runs.sorted_records(), key=itemgetter(0)):
+        day_blocks = defaultdict(list)
+        for _, day, start, _, end, course, teachers, room, class_name in records:
+            day_blocks[day].append(Session(day, start, end, course, tuple(teachers), room, class_name))
+        yield name, day_blocks
+
+
+def iter_rendered_tables(runs, label, conflicts, fragments):
+    """Yield (entity, table html) in name order, rendering each entity's table as it is read back."""
+    for name, day_blocks in iter_entity_blocks(runs):
+        yield name, build_generic_tables({name: day_blocks}, label, conflicts, fragments)[name]
+        fragments.fragments.clear()  # bounded memory over cross-view reuse
+
+
+def iter_class_tables(runs):
+    """Yield (class name, table html) in name order; like extract_tables, the last page of a name wins."""
+    for name, records in groupby(runs.sorted_records(), key=itemgetter(0)):
+        for record in records:
+            table_html = record[2]
+        yield name, table_html
+
+
+def spill_sessions(runs, names, args, metrics):
+    """Parse every class page and spill its table and sessions to the class/teacher/course/room runs.
+
+    Session records are [entity, day, start, seq, end, course, teachers, room, class_name]; seq
+    numbers sessions in directory order, so sorting keeps extract_tables' order within each start.
+    Only the entity names are kept in memory.
+    """
+    cache = None if args.no_cache else ParseCache(CACHE_FILE, rebuild=args.rebuild_cache, backend=args.parser)
+    seq = 0
+    try:
+        parsed = iter_parsed_files(args.jobs, cache, args.parser, metrics, batch_size=SPILL_BATCH_FILES)
+        for file_seq, (_, result) in enumerate(parsed):
+            if result is None:
+                continue
+            class_name, table_html, sessions = result
+            runs["class"].add([class_name, file_seq, table_html])
+            names["class"].add(class_name)
+            for session in sessions:
+                day, start, end, course, teachers, room, _ = session
+                for view, name in [*(("teacher", teacher) for teacher in teachers), ("course", course), ("room", room)]:
+                    runs[view].add([name, day, start, seq, end, course, teachers, room, class_name])
+                    names[view].add(name)
+                seq += 1
+        for view_runs in runs.values():
+            view_runs.flush()
+    finally:
+        if cache is not None:
+            cache.close()
+            metrics.info["cache"] = {"hits": cache.hits, "misses": cache.misses}
+            print(f"Parse cache: {cache.hits} hits, {cache.misses} misses.")
+
+
+def build_low_memory(args, metrics):
+    """Out-of-core variant of build for corpora whose sessions do not fit in memory.
+
+    Sessions are spilled to entity-partitioned runs on disk (see spill_sessions), externally sorted
+    by (entity, day, start), and each entity's table is rendered and written in one streaming pass,
+    so peak RSS stays flat as the corpus grows. Conflicts are found in a first pass over the
+    teacher and room runs. Tables are written in name order rather than first-seen order.
+    """
+    with tempfile.TemporaryDirectory(prefix="timetable-spill-", dir=args.spill_dir) as spill_dir:
+        # Class records are [name, file_seq, table_html]; session records see spill_sessions
+        runs = {view: SpillRuns(spill_dir, view, 2 if view == "class" else 4)
+                for view in ("class", "teacher", "course", "room")}
+        names = {view: set() for view in runs}
+
+        print("Extracting tables to disk...")
+        with metrics.phase("extract"):
+            spill_sessions(runs, names, args, metrics)
+        spilled_mb = sum(os.path.getsize(path) for view in runs.values() for path in view.runs) / 1e6
+        print(f"Found {len(names['class'])} classes, {len(names['teacher'])} teachers, {len(names['course'])} "
+              f"courses, and {len(names['room'])} rooms ({sum(view.records for view in runs.values())} records, "
+              f"{spilled_mb:.1f} MB in {sum(len(view.runs) for view in runs.values())} runs).")
+
+        with metrics.phase("conflicts"):
+            found = []
+            for view, label in (("teacher", "Teacher"), ("room", "Room")):
+                for name, day_blocks in iter_entity_blocks(runs[view]):
+                    found.extend(find_conflicts({name: day_blocks}, label))
+            conflicts = write_conflicts(found)
+            del found
+
+        print("Building and writing timetables...")
+        fragments = FragmentCache()
+        conflicts = conflicts if args.highlight_conflicts else None
+        tables = [iter_class_tables(runs["class"])] + [
+            iter_rendered_tables(runs[view], label, conflicts, fragments)
+            for view, label in (("teacher", "Teacher"), ("course", "Course"), ("room", "Room"))
+        ]
+        with metrics.phase("render"):
+            if args.sharded:
+                index_path = write_sharded_output(SHARD_DIR, *tables)
+            else:
+                with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+                    write_html(f, *tables, names=names.values())
+        fragments.report()
+
+    metrics.info["entities"] = {
+        "classes": len(names["class"]), "teachers": len(names["teacher"]),
+        "courses": len(names["course"]), "rooms": len(names["room"]),
+    }
+    metrics.info["peak_rss_mb"] = {"main": round(peak_rss_mb(), 1), "workers": round(peak_rss_mb(children=True), 1)}
+    if args.sharded:
+        print(f"✅ Done! Serve {SHARD_DIR}/ over HTTP and open {index_path}.")
+    else:
+        print(f"✅ Done! Open {OUTPUT_FILE} in your browser.")
+    print(f"Peak RSS: {metrics.info['peak_rss_mb']['main']:.0f} MB"
+          + (f" (parse workers: {metrics.info['peak_rss_mb']['workers']:.0f} MB)." if args.jobs > 1 else "."))
+
+
+def input_signature():
+    """Map each class page path in INPUT_DIR to its (size, mtime)."""
+    signature = {}
+    for entry in os.scandir(INPUT_DIR):
+        if entry.name.endswith(".html"):
+            st = entry.stat()
+            signature[entry.path] = (st.st_size, st.st_mtime_ns)
+    return signature
+
+
+def watch_changes(debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL):
+    """Yield the set of class page paths created, modified or deleted in INPUT_DIR, one set per burst.
+
+    Uses inotify when inotify_simple is installed, else compares sizes and mtimes every poll_interval
+    seconds. A burst ends once no further change arrives for debounce seconds.
+    """
+    if inotify_simple is not None:
+        flags = inotify_simple.flags
+        with inotify_simple.INotify() as inotify:
+            inotify.add_watch(INPUT_DIR, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+            while True:
+                changed = set()
+                events = inotify.read()
+                while events:
+                    changed.update(os.path.join(INPUT_DIR, e.name) for e in events if e.name.endswith(".html"))
+                    events = inotify.read(timeout=int(debounce * 1000))
+                if changed:
+                    yield changed
+
+    signature = input_signature()
+    while True:
+        time.sleep(poll_interval)
+        current = input_signature()
+        changed = set()
+        while current != signature:
+            changed.update(path for path in signature.keys() | current.keys() if signature.get(path) != current.get(path))
+            signature = current
+            time.sleep(debounce)
+            current = input_signature()
+        if changed:
+            yield changed
+
+
+class IncrementalBuild:
+    """A build that keeps its parse results, block maps and rendered tables to patch changed pages in.
+
+    update() retracts a changed page's old sessions from the teacher, course and room maps, adds the
+    new ones and re-renders only the entities they touched. Sessions of a touched entity are kept
+    in directory order, as extract_tables merges them, so the tables match a full rebuild.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.cache = None if args.no_cache else ParseCache(CACHE_FILE, rebuild=args.rebuild_cache, backend=args.parser)
+        self.results = {}
+        self.class_tables = {}
+        self.blocks = {"teacher": new_block_map(), "course": new_block_map(), "room": new_block_map()}
+        self.tables = {"teacher": {}, "course": {}, "room": {}}
+        self.conflicts = None
+        self.fragments = FragmentCache()
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def load(self):
+        """Run the full build, keeping everything update() needs."""
+        print("Extracting tables...")
+        filepaths, results = parse_input_files(self.args.jobs, self.cache, self.args.parser)
+        self.results = dict(zip(filepaths, results))
+        for result in results:
+            if result is not None:
+                self.class_tables[result[0]] = result[1]
+                add_sessions(result[2], *self.blocks.values())
+        if self.cache is not None:
+            self.cache.commit()
+        print(f"Found {len(self.class_tables)} classes, {len(self.blocks['teacher'])} teachers, "
+              f"{len(self.blocks['course'])} courses, and {len(self.blocks['room'])} rooms.")
+        self.render(None)
+
+    @staticmethod
+    def entities(session):
+        for teacher in session.teachers:
+            yield "teacher", teacher
+        yield "course", session.course
+        yield "room", session.room
+
+    def parse(self, path):
+        if self.cache is not None:
+            found, result, _ = self.cache.lookup(path)
+            if found:
+                return result
+        result, stats = parse_class_file_stats(path, self.args.parser)
+        if self.cache is not None:
+            self.cache.store(path, result, stats)
+        return result
+
+    def update(self, paths):
+        """Patch the pages at paths (new, modified or deleted) into the build and rewrite the output."""
+        started = time.perf_counter()
+        touched = {"class": set(), "teacher": set(), "course": set(), "room": set()}
+        updates = []
+        for path in sorted(paths):
+            old = self.results.pop(path, None)
+            try:
+                new = self.results[path] = self.parse(path)
+            except FileNotFoundError:
+                new = None
+            if new != old:  # else rewritten with the same content
+                updates.append((old, new))
+        if self.cache is not None:
+            self.cache.commit()
+        if not updates:
+            return
+
+        # Retract every old page before adding any new one, so a renamed page or a page moving its
+        # sessions to another changed page is not removed again after being added
+        for old, _ in updates:
+            if old is None:
+                continue
+            touched["class"].add(old[0])
+            for session in old[2]:
+                for view, name in self.entities(session):
+                    day_blocks = self.blocks[view][name]
+                    day_blocks[session.day].remove(session)
+                    if not day_blocks[session.day]:
+                        del day_blocks[session.day]
+                    if not day_blocks:
+                        del self.blocks[view][name]
+                    touched[view].add(name)
+        for _, new in updates:
+            if new is None:
+                continue
+            touched["class"].add(new[0])
+            add_sessions(new[2], *self.blocks.values())
+            for session in new[2]:
+                for view, name in self.entities(session):
+                    touched[view].add(name)
+
+        # Rebuild the touched class tables and the touched entities' session order from the pages in
+        # directory order, as extract_tables merges them (the last page of a class name wins)
+        position = {}
+        class_tables = {}
+        for i, filename in enumerate(os.listdir(INPUT_DIR)):
+            result = self.results.get(os.path.join(INPUT_DIR, filename))
+            if result is not None:
+                position[result[0]] = i
+                if result[0] in touched["class"]:
+                    class_tables[result[0]] = result[1]
+        for name in touched["class"]:
+            if name in class_tables:
+                self.class_tables[name] = class_tables[name]
+            else:
+                self.class_tables.pop(name, None)
+        for view in self.blocks:
+            for name in touched[view]:
+                for blocks in self.blocks[view].get(name, {}).values():
+                    blocks.sort(key=lambda session: position[session.class_name])
+
+        self.fragments = FragmentCache()  # drop the cells of retracted sessions
+        self.render(touched)
+        print(f"Updated {len(updates)} changed pages in {(time.perf_counter() - started) * 1000:.0f} ms "
+              f"({len(touched['teacher'])} teacher, {len(touched['course'])} course and "
+              f"{len(touched['room'])} room tables re-rendered).")
+
+    def render(self, touched):
+        """Check conflicts, export and write the output, re-rendering the touched entities (all if None)."""
+        args = self.args
+        teacher_blocks, course_blocks, room_blocks = self.blocks.values()
+        conflicting = report_conflicts(teacher_blocks, room_blocks)
+        if args.highlight_conflicts:
+            if touched is not None:
+                # A session entering or leaving a conflict changes its cell in every view
+                for session in conflicting ^ self.conflicts:
+                    for view, name in self.entities(session):
+                        touched[view].add(name)
+            self.conflicts = conflicting
+
+        if args.export_db:
+            export_database(args.export_db, self.class_tables, course_blocks)
+
+        if args.data_only:
+            write_output(self.class_tables, teacher_blocks, course_blocks, room_blocks, data_only=True,
+                         conflicts=self.conflicts, free_slots=args.free_slots)
+            return
+
+        extra_html = ""
+        if args.free_slots:
+            extra_html = build_free_slot_finder(OccupancyIndex.from_blocks(teacher_blocks, room_blocks, DAYS))
+
+        for (view, tables), label in zip(self.tables.items(), ("Teacher", "Course", "Room")):
+            data_blocks = self.blocks[view]
+            names = data_blocks if touched is None else touched[view]
+            for name in names:
+                if name not in data_blocks:
+                    tables.pop(name, None)
+            tables.update(build_generic_tables(
+                {name: data_blocks[name] for name in names if name in data_blocks}, label, self.conflicts,
+                self.fragments,
+            ))
+
+        write_tables(self.class_tables, *self.tables.values(), extra_html, sharded=args.sharded, changed=touched)
+
+
+def watch(args):
+    """Build once, then patch in changed class pages whenever INPUT_DIR changes, until interrupted."""
+    incremental = IncrementalBuild(args)
+    try:
+        incremental.load()
+        mode = "inotify" if inotify_simple is not None else f"polling every {WATCH_POLL_INTERVAL}s"
+        print(f"Watching {INPUT_DIR}/ for changes ({mode}); press Ctrl+C to stop.")
+        for paths in watch_changes():
+            incremental.update(paths)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        incremental.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine KFUEIT class timetables into one searchable page.")
+    parser.add_argument("-j", "--jobs", type=int, nargs="?", const=os.cpu_count() or 1, default=os.cpu_count() or 1,
+                        help="parse class files in a process pool of N workers (default: CPU count; 1 parses serially)")
+    parser.add_argument("--no-cache", action="store_true", help=f"ignore {CACHE_FILE} and parse every file")
+    parser.add_argument("--rebuild-cache", action="store_true", help=f"discard {CACHE_FILE} and repopulate it")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+                        help=f"HTML parser backend (default: {DEFAULT_BACKEND})")
+    output_mode = parser.add_mutually_exclusive_group()
+    output_mode.add_argument("--data-only", action="store_true",
+                             help="embed one deduplicated session dataset and render the tables in the browser")
+    output_mode.add_argument("--sharded", action="store_true",
+                             help=f"write {SHARD_DIR}/index.html plus one precompressed JSON fragment per entity")
+    parser.add_argument("--highlight-conflicts", action="store_true",
+                        help=f"outline double-booked sessions in the tables (always listed in {CONFLICTS_FILE})")
+    parser.add_argument("--free-slots", action="store_true",
+                        help="embed the room/teacher occupancy index and a free room / common free time finder")
+    parser.add_argument("--export-db", nargs="?", const=DB_FILE, metavar="PATH",
+                        help=f"also upsert all sessions into an indexed SQLite database (default PATH: {DB_FILE})")
+    parser.add_argument("--metrics", nargs="?", const=METRICS_FILE, metavar="PATH",
+                        help=f"write per-phase and per-file metrics as JSON (default PATH: {METRICS_FILE})")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help=f"profile the build (cprofile writes {PROFILE_FILE})")
+    parser.add_argument("--check-backends", action="store_true",
+                        help="verify that all parser backends extract identical blocks, then exit")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="spill sessions to sorted runs on disk and render one entity at a time (flat peak RSS)")
+    parser.add_argument("--spill-dir", metavar="DIR",
+                        help="folder for the --low-memory runs (default: the system temp folder)")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"after the build, keep watching {INPUT_DIR}/ and re-render only what changed pages touch")
+    args = parser.parse_args()
+
+    if args.check_backends:
+        raise SystemExit(0 if compare_backends() else 1)
+
+    if args.low_memory:
+        for option in ("data_only", "free_slots", "export_db", "watch"):
+            if getattr(args, option):
+                parser.error(f"--low-memory cannot be combined with --{option.replace('_', '-')}")
+
+    if args.watch:
+        watch(args)
+        return
+
+    metrics = BuildMetrics()
+    metrics.info = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": {key: value for key, value in vars(args).items() if key not in ("metrics", "profile")},
+    }
+    run = build_low_memory if args.low_memory else build
+    if args.profile:
+        run_profiled(args.profile, run, args, metrics)
+    else:
+        run(args, metrics)
+
+    metrics.print_summary()
+    if args.metrics:
+        metrics.write(args.metrics)
+        print(f"Metrics written to {args.metrics}.")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+DB_FILE = "timetables.sqlite"
+
+# Names live in their own tables; day/start are repeated on session_teachers so the
+# (teacher, day, start) index covers teacher lookups without touching sessions first
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classes (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, fingerprint TEXT);
+CREATE TABLE IF NOT EXISTS teachers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS rooms (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS courses (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    room_id INTEGER NOT NULL REFERENCES rooms(id)
+);
+CREATE TABLE IF NOT EXISTS session_teachers (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    teacher_id INTEGER NOT NULL REFERENCES teachers(id),
+    day INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+CREATE INDEX IF NOT EXISTS sessions_room_day_start ON sessions (room_id, day, start);
+CREATE INDEX IF NOT EXISTS sessions_class_day_start ON sessions (class_id, day, start);
+CREATE INDEX IF NOT EXISTS sessions_course_day_start ON sessions (course_id, day, start);
+CREATE INDEX IF NOT EXISTS session_teachers_teacher_day_start ON session_teachers (teacher_id, day, start);
+CREATE VIEW IF NOT EXISTS session_details AS
+    SELECT s.id, s.day, s.start, s.end, co.name AS course,
+           (SELECT group_concat(name, ', ') FROM (
+                SELECT t.name FROM session_teachers st JOIN teachers t ON t.id = st.teacher_id
+                WHERE st.session_id = s.id ORDER BY st.position)) AS teachers,
+           r.name AS room, cl.name AS class
+    FROM sessions s
+    JOIN courses co ON co.id = s.course_id
+    JOIN rooms r ON r.id = s.room_id
+    JOIN classes cl ON cl.id = s.class_id;
+"""
+
+
+def connect(path=DB_FILE):
+    """Open (and if needed create) the timetable database."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")  # readers (notice boards, attendance) don't block an export
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def sessions_by_class(class_names, course_blocks):
+    """Group all sessions by class; every session is listed under exactly one course."""
+    by_class = {name: [] for name in class_names}
+    for day_blocks in course_blocks.values():
+        for blocks in day_blocks.values():
+            for session in blocks:
+                by_class.setdefault(session.class_name, []).append(session)
+    return by_class
+
+
+def fingerprint(sessions):
+    return hashlib.sha256(json.dumps(sorted(sessions)).encode("utf-8")).hexdigest()
+
+
+def export_sessions(conn, by_class):
+    """Upsert each class's sessions; classes whose sessions are unchanged are not touched.
+
+    A changed class has its session rows replaced in place, classes that disappeared are deleted,
+    and teachers, rooms and courses no longer referenced are dropped. Everything happens in one
+    transaction. Returns (changed, unchanged, removed) class counts.
+    """
+    name_ids = {table: {} for table in ("teachers", "rooms", "courses")}
+
+    def name_id(table, name):
+        ids = name_ids[table]
+        if name not in ids:
+            conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            ids[name] = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        return ids[name]
+
+    stored = {name: (class_id, fp) for class_id, name, fp in conn.execute("SELECT id, name, fingerprint FROM classes")}
+    changed = unchanged = 0
+    with conn:
+        for class_name, sessions in by_class.items():
+            fp = fingerprint(sessions)
+            class_id, stored_fp = stored.get(class_name, (None, None))
+            if stored_fp == fp:
+                unchanged += 1
+                continue
+
+            changed += 1
+            if class_id is None:
+                class_id = conn.execute(
+                    "INSERT INTO classes (name, fingerprint) VALUES (?, ?)", (class_name, fp)
+                ).lastrowid
+            else:
+                conn.execute("DELETE FROM sessions WHERE class_id = ?", (class_id,))
+                conn.execute("UPDATE classes SET fingerprint = ? WHERE id = ?", (fp, class_id))
+
+            for session in sessions:
+                session_id = conn.execute(
+                    "INSERT INTO sessions (class_id, day, start, end, course_id, room_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    (class_id, session.day, session.start, session.end,
+                     name_id("courses", session.course), name_id("rooms", session.room)),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO session_teachers (session_id, position, teacher_id, day, start) VALUES (?, ?, ?, ?, ?)",
+                    [(session_id, position, name_id("teachers", teacher), session.day, session.start)
+                     for position, teacher in enumerate(session.teachers)],
+                )
+
+        removed = [(class_id,) for name, (class_id, _) in stored.items() if name not in by_class]
+        conn.executemany("DELETE FROM classes WHERE id = ?", removed)
+
+        if changed or removed:
+            conn.execute("DELETE FROM teachers WHERE id NOT IN (SELECT teacher_id FROM session_teachers)")
+            conn.execute("DELETE FROM rooms WHERE id NOT IN (SELECT room_id FROM sessions)")
+            conn.execute("DELETE FROM courses WHERE id NOT IN (SELECT course_id FROM sessions)")
+    return changed, unchanged, len(removed)
+
+
+def export_database(path, class_names, course_blocks):
+    """Open the database at path, export the extracted sessions into it and report what changed."""
+    conn = connect(path)
+    try:
+        changed, unchanged, removed = export_sessions(conn, sessions_by_class(class_names, course_blocks))
+    finally:
+        conn.close()
+    print(f"Exported to {path}: {changed} classes updated, {unchanged} unchanged, {removed} removed.")
+
+
+# (entity table, query filtering on its id and optionally a day); each is served by one of the indexes
+LOOKUPS = {
+    "teacher": ("teachers", """
+        SELECT d.day, d.start, d.end, d.course, d.teachers, d.room, d.class
+        FROM session_teachers st JOIN session_details d ON d.id = st.session_id
+        WHERE st.teacher_id = ? {day} ORDER BY st.day, st.start"""),
+    "room": ("rooms", """
+        SELECT d.day, d.start, d.end, d.course, d.teachers, d.room, d.class
+        FROM sessions s JOIN session_details d ON d.id = s.id
+        WHERE s.room_id = ? {day} ORDER BY s.day, s.start"""),
+    "class": ("classes", """
+        SELECT d.day, d.start, d.end, d.course, d.teachers, d.room, d.class
+        FROM sessions s JOIN session_details d ON d.id = s.id
+        WHERE s.class_id = ? {day} ORDER BY s.day, s.start"""),
+    "course": ("courses", """
+        SELECT d.day, d.start, d.end, d.course, d.teachers, d.room, d.class
+        FROM sessions s JOIN session_details d ON d.id = s.id
+        WHERE s.course_id = ? {day} ORDER BY s.day, s.start"""),
+}
+
+
+def lookup(conn, kind, name, day=None):
+    """Sessions of one teacher, room, class or course (optionally on one day index), in time order.
+
+    Returns None for an unknown name, else (day, start, end, course, teachers, room, class) rows.
+    """
+    table, query = LOOKUPS[kind]
+    row = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    alias = "st" if kind == "teacher" else "s"
+    if day is None:
+        return conn.execute(query.format(day=""), (row[0],)).fetchall()
+    return conn.execute(query.format(day=f"AND {alias}.day = ?"), (row[0], day)).fetchall()
+
+
+def main():
+    from free_slots import parse_day
+    from timetable_combiner import CACHE_FILE, DAYS, ParseCache, extract_tables, min_to_time
+
+    parser = argparse.ArgumentParser(description="Export the extracted timetables to SQLite and query them.")
+    parser.add_argument("--db", default=DB_FILE, help=f"database path (default: {DB_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("export", help="upsert the sessions of every new or changed class")
+    query_cmd = commands.add_parser("query", help="one teacher's, room's, class's or course's sessions")
+    entity = query_cmd.add_mutually_exclusive_group(required=True)
+    for kind in LOOKUPS:
+        entity.add_argument(f"--{kind}", help=f"{kind} name")
+    query_cmd.add_argument("--day", help="day name or prefix, e.g. Thu")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        cache = ParseCache(CACHE_FILE)
+        try:
+            class_tables, _, course_blocks, _ = extract_tables(cache=cache)
+        finally:
+            cache.close()
+        export_database(args.db, class_tables, course_blocks)
+        return
+
+    conn = connect(args.db)
+    try:
+        try:
+            day = parse_day(args.day, DAYS) if args.day else None
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        kind = next(kind for kind in LOOKUPS if getattr(args, kind))
+        started = time.perf_counter()
+        rows = lookup(conn, kind, getattr(args, kind), day)
+        elapsed = time.perf_counter() - started
+        if rows is None:
+            parser.error(f"unknown {kind}: {getattr(args, kind)}")
+        for d, start, end, course, teachers, room, class_name in rows:
+            print(f"{DAYS[d][:3] if d >= 0 else '?':<4}{min_to_time(start)} - {min_to_time(end)}  "
+                  f"{course} | {teachers} | {room} | {class_name}")
+        print(f"{len(rows)} sessions in {elapsed * 1e6:.0f} µs.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from urllib.parse import quote
+
+from aiohttp import web
+
+from timetable_combiner import (
+    CACHE_FILE, DEFAULT_BACKEND, INPUT_DIR, PARSER_BACKENDS, FragmentCache, ParseCache, build_generic_tables,
+    build_sharded_index, extract_tables, find_conflicts, input_signature,
+)
+
+# Views rendered on demand from the session model; class tables are the source pages' own tables
+RENDERED_VIEWS = {"teacher": "Teacher", "course": "Course", "room": "Room"}
+LATENCY_SAMPLES = 2000  # recent request latencies kept for the percentiles in /stats
+
+
+class LRUCache:
+    """Rendered responses keyed by (view, name), bounded by the total size of the bodies."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, body, etag):
+        self.discard(key)
+        self.entries[key] = (body, etag)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, (old_body, _) = self.entries.popitem(last=False)
+            self.bytes -= len(old_body)
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[0])
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+class TimetableServer:
+    """Keeps the extracted sessions in memory and renders each requested table once, until its sessions change."""
+
+    def __init__(self, backend=DEFAULT_BACKEND, workers=1, cache_bytes=64 * 1024 * 1024, check_interval=2.0,
+                 highlight_conflicts=False):
+        self.backend = backend
+        self.workers = workers
+        self.check_interval = check_interval
+        self.highlight_conflicts = highlight_conflicts
+        self.cache = LRUCache(cache_bytes)
+        self.signature = None
+        self.views = {"class": {}, "teacher": {}, "course": {}, "room": {}}
+        self.conflicts = None
+        self.fragments = FragmentCache()
+        self.index = None
+        self.reloads = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.renders = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def extract(self):
+        """Re-extract every page (only changed ones are parsed, via the parse cache)."""
+        cache = ParseCache(CACHE_FILE, backend=self.backend)
+        try:
+            class_tables, teacher_blocks, course_blocks, room_blocks = extract_tables(
+                self.workers, cache=cache, backend=self.backend
+            )
+        finally:
+            cache.close()
+        conflicts = None
+        if self.highlight_conflicts:
+            found = find_conflicts(teacher_blocks, "Teacher") + find_conflicts(room_blocks, "Room")
+            conflicts = {session for conflict in found for session in conflict["_sessions"]}
+        views = {"class": class_tables, "teacher": teacher_blocks, "course": course_blocks, "room": room_blocks}
+        return views, conflicts
+
+    async def reload_if_changed(self):
+        """Pick up changed source pages and drop only the cached tables whose content changed."""
+        signature = input_signature()
+        if signature == self.signature:
+            return
+        views, conflicts = await asyncio.get_running_loop().run_in_executor(None, self.extract)
+        self.signature = signature
+        self.reloads += 1
+
+        names_changed = any(set(views[view]) != set(self.views[view]) for view in views)
+        if conflicts != self.conflicts:
+            self.cache.clear()  # highlighting may change anywhere
+        else:
+            for view, entities in views.items():
+                old = self.views[view]
+                for name in set(old) | set(entities):
+                    if old.get(name) != entities.get(name):
+                        self.cache.discard((view, name))
+        if names_changed or self.index is None:
+            shard_index = {
+                view: {name: f"table/{view}?name={quote(name)}" for name in sorted(entities)}
+                for view, entities in views.items()
+            }
+            body = build_sharded_index(shard_index).encode("utf-8")
+            self.index = (body, self._etag(body))
+
+        self.views, self.conflicts = views, conflicts
+        self.fragments = FragmentCache()
+        print(f"Loaded {len(views['class'])} classes, {len(views['teacher'])} teachers, "
+              f"{len(views['course'])} courses and {len(views['room'])} rooms (reload {self.reloads}).")
+
+    async def watch_sources(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:  # keep serving the last good model
+                print(f"[ERROR] reload failed: {e}")
+
+    @staticmethod
+    def _etag(body):
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def render(self, view, name):
+        entities = self.views[view]
+        if name not in entities:
+            return None
+        self.renders += 1
+        if view == "class":
+            html = entities[name]
+        else:
+            html = build_generic_tables(
+                {name: entities[name]}, RENDERED_VIEWS[view], self.conflicts, self.fragments
+            )[name]
+        return json.dumps(html).encode("utf-8")
+
+    def respond(self, request, body, etag, content_type):
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get("If-None-Match", ""):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        response = web.Response(body=body, content_type=content_type, charset="utf-8", headers=headers)
+        response.enable_compression()
+        return response
+
+    async def handle_index(self, request):
+        body, etag = self.index
+        return self.respond(request, body, etag, "text/html")
+
+    async def handle_table(self, request):
+        view = request.match_info["view"]
+        name = request.query.get("name")
+        if view not in self.views or name is None:
+            raise web.HTTPNotFound()
+
+        entry = self.cache.get((view, name))
+        if entry is None:
+            body = self.render(view, name)
+            if body is None:
+                raise web.HTTPNotFound()
+            entry = (body, self._etag(body))
+            self.cache.put((view, name), *entry)
+        return self.respond(request, entry[0], entry[1], "application/json")
+
+    async def handle_stats(self, request):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[int(p * (len(latencies) - 1))] * 1000, 3) if latencies else None
+
+        lookups = self.cache.hits + self.cache.misses
+        return web.json_response({
+            "requests": self.requests,
+            "notModified": self.not_modified,
+            "renders": self.renders,
+            "reloads": self.reloads,
+            "cache": {
+                "entries": len(self.cache.entries),
+                "bytes": self.cache.bytes,
+                "maxBytes": self.cache.max_bytes,
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "hitRate": round(self.cache.hits / lookups, 4) if lookups else None,
+                "evictions": self.cache.evictions,
+            },
+            "latencyMs": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        })
+
+    @web.middleware
+    async def count_requests(self, request, handler):
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - started)
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.count_requests])
+        app.router.add_get("/", self.handle_index)
+        app.router.add_get("/table/{view}", self.handle_table)
+        app.router.add_get("/stats", self.handle_stats)
+
+        async def start_watching(app):
+            await self.reload_if_changed()
+            app["watcher"] = asyncio.create_task(self.watch_sources())
+
+        async def stop_watching(app):
+            app["watcher"].cancel()
+
+        app.on_startup.append(start_watching)
+        app.on_cleanup.append(stop_watching)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the timetables, rendering each table on demand.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-mb", type=float, default=64, help="size bound of the rendered table cache")
+    parser.add_argument("--check-interval", type=float, default=2.0,
+                        help=f"seconds between checks of {INPUT_DIR}/ for changed pages")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="parse worker processes for (re)loads (default: CPU count)")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS), default=DEFAULT_BACKEND,
+                        help=f"HTML parser backend (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--highlight-conflicts", action="store_true", help="outline double-booked sessions")
+    args = parser.parse_args()
+
+    server = TimetableServer(args.parser, max(1, args.jobs), int(args.cache_mb * 1024 * 1024),
+                             args.check_interval, args.highlight_conflicts)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()